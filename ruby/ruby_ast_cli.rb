@@ -378,26 +378,11 @@ class RubyASTExtractor
   end
 end
 
-# Main execution
-if ARGV.empty?
-  STDERR.puts "Usage: #{$0} <file_path>"
-  exit 1
-end
-
-file_path = ARGV[0]
-
-unless File.exist?(file_path)
-  STDERR.puts "File not found: #{file_path}"
-  exit 1
-end
-
-begin
-  source = File.read(file_path)
+def extract(file_path, source)
   extractor = RubyASTExtractor.new(file_path)
   extractor.parse(source)
-  
-  # Build output JSON
-  output = {
+
+  {
     hash: Digest::SHA256.hexdigest(source),
     file_type: extractor.file_type,
     line_count: source.lines.count,
@@ -414,10 +399,50 @@ begin
     callbacks: extractor.callbacks,
     scopes: extractor.scopes
   }
-  
-  puts JSON.pretty_generate(output)
+end
+
+# Server mode: stay resident and answer newline-delimited JSON requests
+# {"id": ..., "path": ..., "source": ...} with {"id": ..., "result": ...} or
+# {"id": ..., "error": ...}, one line each. "source" is optional; without
+# it the file is read from "path".
+if ARGV.first == '--server'
+  STDOUT.sync = true
+
+  STDIN.each_line do |line|
+    id = nil
+    begin
+      request = JSON.parse(line)
+      id = request['id']
+      source = request['source'] || File.read(request['path'])
+      response = { id: id, result: extract(request['path'], source) }
+    rescue StandardError => e
+      response = { id: id, error: e.message }
+    end
+    STDOUT.puts JSON.generate(response)
+  end
+
+  exit 0
+end
+
+# Main execution
+if ARGV.empty?
+  STDERR.puts "Usage: #{$0} <file_path> | - | --server"
+  exit 1
+end
+
+# "-" reads the source from STDIN
+file_path = ARGV[0]
+
+unless file_path == '-' || File.exist?(file_path)
+  STDERR.puts "File not found: #{file_path}"
+  exit 1
+end
+
+begin
+  source = file_path == '-' ? STDIN.read : File.read(file_path)
+  puts JSON.generate(extract(file_path, source))
 rescue => e
   STDERR.puts "Error: #{e.message}"
   STDERR.puts e.backtrace.first(5)
   exit 1
-end
\ No newline at end of file
+end
@@ -6,6 +6,7 @@ import Database from 'better-sqlite3';
 import * as path from 'path';
 import * as crypto from 'crypto';
 import { SQLiteGraphStore, GraphStore } from './graph-store.js';
+import { LruCache } from './lru-cache.js';
 
 export interface FileRecord {
   id?: number;
@@ -14,6 +15,11 @@ export interface FileRecord {
   last_indexed?: string;
   file_type: string;
   line_count: number;
+  // Byte offset of each line start plus the file length, as packed uint32s
+  line_offsets?: Buffer | null;
+  // Size and mtime of the file as it was read for the offsets
+  size?: number | null;
+  mtime_ms?: number | null;
 }
 
 export interface SymbolRecord {
@@ -27,8 +33,6 @@ export interface SymbolRecord {
   signature?: string | null;
   visibility: string;
   documentation?: string | null;
-  references?: string;
-  metadata?: string;
 }
 
 export interface CallRecord {
@@ -39,15 +43,205 @@ export interface CallRecord {
   call_type: string;
 }
 
+// Version of the index layout, recorded when a reindex completes. Bump it
+// when a change to the tables or the parsers' output means existing
+// indexes must be rebuilt.
+export const INDEX_FORMAT_VERSION = '1';
+
+// Bump when the shape of the Ruby parser's output changes, so cached
+// parses from older parsers are ignored
+const AST_CACHE_FORMAT = 'v1';
+
+// Hot-path statements, kept as constants so every call hits the same
+// entry in the prepared statement cache
+const SQL_UPSERT_FILE = `
+  INSERT INTO files (path, hash, last_indexed, file_type, line_count, line_offsets, size, mtime_ms)
+  VALUES (@path, @hash, @last_indexed, @file_type, @line_count, @line_offsets, @size, @mtime_ms)
+  ON CONFLICT(path) DO UPDATE SET
+    hash = @hash,
+    last_indexed = @last_indexed,
+    file_type = @file_type,
+    line_count = @line_count,
+    line_offsets = @line_offsets,
+    size = @size,
+    mtime_ms = @mtime_ms
+  RETURNING id
+`;
+
+// File columns other than the line offsets blob and the size and mtime
+// that validate it, which only snippet reads need
+const SQL_FILE_COLUMNS = 'id, path, hash, last_indexed, file_type, line_count';
+
+const SQL_INSERT_SYMBOL = `
+  INSERT INTO symbols (
+    file_id, name, type, parent_symbol, start_line, end_line,
+    signature, visibility, documentation
+  ) VALUES (
+    @file_id, @name, @type, @parent_symbol, @start_line, @end_line,
+    @signature, @visibility, @documentation
+  )
+`;
+
+// Secondary indexes and the FTS triggers are dropped during bulk loads
+// and recreated from these definitions afterwards
+const SYMBOL_INDEXES: Array<[string, string]> = [
+  ['idx_symbols_file_id', 'symbols(file_id)'],
+  ['idx_symbols_type', 'symbols(type)'],
+  ['idx_symbols_parent', 'symbols(parent_symbol)'],
+  ['idx_calls_caller', 'calls(caller_symbol_id)'],
+  ['idx_calls_callee', 'calls(callee_symbol)']
+];
+
+const SQL_SYMBOL_INDEXES = SYMBOL_INDEXES
+  .map(([name, target]) => `CREATE INDEX IF NOT EXISTS ${name} ON ${target};`)
+  .join('\n');
+
+// symbols_fts is an external-content table: it stores only the index, so
+// removals must go through the FTS5 'delete' command with the old values
+const SQL_FTS_TRIGGERS = `
+  CREATE TRIGGER IF NOT EXISTS symbols_ai AFTER INSERT ON symbols BEGIN
+    INSERT INTO symbols_fts(rowid, name, documentation, signature)
+    VALUES (new.id, new.name, new.documentation, new.signature);
+  END;
+
+  CREATE TRIGGER IF NOT EXISTS symbols_ad AFTER DELETE ON symbols BEGIN
+    INSERT INTO symbols_fts(symbols_fts, rowid, name, documentation, signature)
+    VALUES ('delete', old.id, old.name, old.documentation, old.signature);
+  END;
+
+  CREATE TRIGGER IF NOT EXISTS symbols_au AFTER UPDATE ON symbols BEGIN
+    INSERT INTO symbols_fts(symbols_fts, rowid, name, documentation, signature)
+    VALUES ('delete', old.id, old.name, old.documentation, old.signature);
+    INSERT INTO symbols_fts(rowid, name, documentation, signature)
+    VALUES (new.id, new.name, new.documentation, new.signature);
+  END;
+`;
+
+const SQL_DROP_SYMBOL_MAINTENANCE = [
+  'DROP TRIGGER IF EXISTS symbols_ai;',
+  'DROP TRIGGER IF EXISTS symbols_ad;',
+  'DROP TRIGGER IF EXISTS symbols_au;',
+  ...SYMBOL_INDEXES.map(([name]) => `DROP INDEX IF EXISTS ${name};`)
+].join('\n');
+
+// Tables copied out of a staging database, parents before children so
+// foreign keys hold on insert (deletes run in reverse)
+const STAGED_TABLES = [
+  'files',
+  'symbols',
+  'calls',
+  'schema_tables',
+  'schema_columns',
+  'schema_indexes',
+  'schema_foreign_keys',
+  'kg_nodes',
+  'kg_edges'
+];
+
+// Candidates fetched per wanted row when a search filters by file type
+const FILTERED_OVERFETCH = 10;
+
+// Compiled patterns for the REGEXP SQL function
+const regexpCache = new LruCache<string, RegExp>(256);
+
+function compileRegexp(pattern: string): RegExp {
+  let regexp = regexpCache.get(pattern);
+  if (!regexp) {
+    regexp = new RegExp(pattern);
+    regexpCache.set(pattern, regexp);
+  }
+  return regexp;
+}
+
 export class IndexDatabase {
   private db: Database.Database;
+  private statements = new Map<string, Database.Statement>();
+  // Under WAL a separate read-only connection serves queries from the
+  // last committed snapshot without contending with the writer
+  private reader: Database.Database;
+  private readerStatements: Map<string, Database.Statement>;
+  private statsCache: { version: string; stats: any } | null = null;
+  // Symbol line ranges for getSnippet, valid for one data version
+  private symbolLines = new LruCache<string, { start_line: number; end_line: number } | undefined>(1024);
+  private symbolLinesVersion = '';
   public graph: GraphStore;
 
   constructor(dbPath: string) {
     this.db = new Database(dbPath);
-    this.db.pragma('journal_mode = WAL');
-    this.graph = new SQLiteGraphStore(this.db);
+    this.configureConnection(this.db);
     this.initSchema();
+
+    // An in-memory database is private to its connection
+    if (this.db.memory) {
+      this.reader = this.db;
+      this.readerStatements = this.statements;
+    } else {
+      this.reader = new Database(dbPath, { readonly: true });
+      this.configureConnection(this.reader);
+      this.reader.pragma('query_only = ON');
+      this.readerStatements = new Map();
+    }
+
+    this.graph = new SQLiteGraphStore(this.db, this.reader);
+  }
+
+  private configureConnection(db: Database.Database) {
+    // WAL and mmap only apply to file-backed databases; the journal mode
+    // is persistent, so the read-only connection inherits it
+    if (!db.memory && !db.readonly) {
+      db.pragma('journal_mode = WAL');
+      db.pragma('wal_autocheckpoint = 1000');
+    }
+    if (!db.memory) {
+      db.pragma('mmap_size = 268435456'); // 256MB
+    }
+
+    // WAL is durable across crashes with NORMAL; only the last commits
+    // may be lost on power failure, which a reindex recovers anyway
+    db.pragma('synchronous = NORMAL');
+    db.pragma('cache_size = -20000'); // ~20MB page cache
+    db.pragma('temp_store = MEMORY');
+
+    // Deleting a files row cascades to its symbols and their calls. This is
+    // better-sqlite3's default, but the indexer relies on it, so be explicit.
+    db.pragma('foreign_keys = ON');
+
+    // `x REGEXP y` calls regexp(y, x); SQLite has no built-in implementation
+    db.function('regexp', { deterministic: true }, (pattern: unknown, value: unknown) =>
+      value != null && compileRegexp(String(pattern)).test(String(value)) ? 1 : 0
+    );
+  }
+
+  /**
+   * Prepare a statement once per connection and reuse it. SQLite
+   * re-prepares cached statements transparently after schema changes.
+   */
+  private prepare(sql: string): Database.Statement {
+    let stmt = this.statements.get(sql);
+    if (!stmt) {
+      stmt = this.db.prepare(sql);
+      this.statements.set(sql, stmt);
+    }
+    return stmt;
+  }
+
+  // Same as prepare(), on the read-only connection
+  private read(sql: string): Database.Statement {
+    let stmt = this.readerStatements.get(sql);
+    if (!stmt) {
+      stmt = this.reader.prepare(sql);
+      this.readerStatements.set(sql, stmt);
+    }
+    return stmt;
+  }
+
+  /**
+   * Fold the WAL back into the main database file without blocking readers
+   */
+  checkpoint(): void {
+    if (!this.db.memory) {
+      this.db.pragma('wal_checkpoint(PASSIVE)');
+    }
   }
 
   private initSchema() {
@@ -60,22 +254,41 @@ export class IndexDatabase {
       )
     `);
 
+    // Native parser output by file content hash. Kept apart from the
+    // indexed tables: clears and staged rebuilds leave it in place.
+    this.db.exec(`
+      CREATE TABLE IF NOT EXISTS ast_cache (
+        hash TEXT PRIMARY KEY,
+        format TEXT NOT NULL,
+        result TEXT NOT NULL
+      ) WITHOUT ROWID
+    `);
+
     // Files table
     this.db.exec(`
       CREATE TABLE IF NOT EXISTS files (
-        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        id INTEGER PRIMARY KEY,
         path TEXT UNIQUE NOT NULL,
         hash TEXT,
         last_indexed TIMESTAMP,
         file_type TEXT,
-        line_count INTEGER
+        line_count INTEGER,
+        line_offsets BLOB,
+        size INTEGER,
+        mtime_ms REAL
       )
     `);
+    const fileColumns = this.db.prepare('SELECT name FROM pragma_table_info(?)').pluck().all('files');
+    for (const [column, type] of [['line_offsets', 'BLOB'], ['size', 'INTEGER'], ['mtime_ms', 'REAL']]) {
+      if (!fileColumns.includes(column)) {
+        this.db.exec(`ALTER TABLE files ADD COLUMN ${column} ${type}`);
+      }
+    }
 
     // Symbols table (classes, modules, methods)
     this.db.exec(`
       CREATE TABLE IF NOT EXISTS symbols (
-        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        id INTEGER PRIMARY KEY,
         file_id INTEGER,
         name TEXT NOT NULL,
         type TEXT NOT NULL,
@@ -92,7 +305,7 @@ export class IndexDatabase {
     // Calls table (method calls, includes, requires)
     this.db.exec(`
       CREATE TABLE IF NOT EXISTS calls (
-        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        id INTEGER PRIMARY KEY,
         caller_symbol_id INTEGER,
         callee_symbol TEXT,
         line_number INTEGER,
@@ -101,48 +314,46 @@ export class IndexDatabase {
       )
     `);
 
-    // Full-text search table for symbols
+    // Full-text search table for symbols. The prefix indexes serve
+    // prefix queries (User* finding UserMailer) without scanning every
+    // term; a table from before they existed is rebuilt with them.
+    const ftsSql = this.db.prepare(
+      `SELECT sql FROM sqlite_master WHERE type = 'table' AND name = 'symbols_fts'`
+    ).pluck().get() as string | undefined;
+    const rebuildFts = !!ftsSql && !ftsSql.includes('prefix=');
+    if (rebuildFts) {
+      this.db.exec('DROP TABLE symbols_fts');
+    }
     this.db.exec(`
       CREATE VIRTUAL TABLE IF NOT EXISTS symbols_fts USING fts5(
         name,
         documentation,
         signature,
         content='symbols',
-        content_rowid='id'
+        content_rowid='id',
+        prefix='2 3'
       )
     `);
+    if (rebuildFts) {
+      this.db.exec(`INSERT INTO symbols_fts(symbols_fts) VALUES('rebuild')`);
+    }
 
-    // Triggers to keep FTS in sync
+    // Triggers to keep FTS in sync. Older databases created the delete
+    // and update triggers with plain DELETEs, which leave tokens behind
+    // in an external-content table, hence the unconditional drop.
     this.db.exec(`
-      CREATE TRIGGER IF NOT EXISTS symbols_ai AFTER INSERT ON symbols BEGIN
-        INSERT INTO symbols_fts(rowid, name, documentation, signature)
-        VALUES (new.id, new.name, new.documentation, new.signature);
-      END;
-
-      CREATE TRIGGER IF NOT EXISTS symbols_ad AFTER DELETE ON symbols BEGIN
-        DELETE FROM symbols_fts WHERE rowid = old.id;
-      END;
-
-      CREATE TRIGGER IF NOT EXISTS symbols_au AFTER UPDATE ON symbols BEGIN
-        DELETE FROM symbols_fts WHERE rowid = old.id;
-        INSERT INTO symbols_fts(rowid, name, documentation, signature)
-        VALUES (new.id, new.name, new.documentation, new.signature);
-      END;
+      DROP TRIGGER IF EXISTS symbols_ad;
+      DROP TRIGGER IF EXISTS symbols_au;
     `);
+    this.db.exec(SQL_FTS_TRIGGERS);
 
     // Create indices
-    this.db.exec(`
-      CREATE INDEX IF NOT EXISTS idx_symbols_file_id ON symbols(file_id);
-      CREATE INDEX IF NOT EXISTS idx_symbols_type ON symbols(type);
-      CREATE INDEX IF NOT EXISTS idx_symbols_parent ON symbols(parent_symbol);
-      CREATE INDEX IF NOT EXISTS idx_calls_caller ON calls(caller_symbol_id);
-      CREATE INDEX IF NOT EXISTS idx_calls_callee ON calls(callee_symbol);
-    `);
+    this.db.exec(SQL_SYMBOL_INDEXES);
 
     // Schema tables for db/schema.rb metadata
     this.db.exec(`
       CREATE TABLE IF NOT EXISTS schema_tables (
-        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        id INTEGER PRIMARY KEY,
         name TEXT UNIQUE NOT NULL,
         primary_key TEXT,
         last_indexed TIMESTAMP DEFAULT CURRENT_TIMESTAMP
@@ -151,7 +362,7 @@ export class IndexDatabase {
 
     this.db.exec(`
       CREATE TABLE IF NOT EXISTS schema_columns (
-        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        id INTEGER PRIMARY KEY,
         table_id INTEGER NOT NULL,
         name TEXT NOT NULL,
         column_type TEXT NOT NULL,
@@ -167,7 +378,7 @@ export class IndexDatabase {
 
     this.db.exec(`
       CREATE TABLE IF NOT EXISTS schema_indexes (
-        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        id INTEGER PRIMARY KEY,
         table_id INTEGER NOT NULL,
         name TEXT,
         columns TEXT NOT NULL, -- JSON array
@@ -179,7 +390,7 @@ export class IndexDatabase {
 
     this.db.exec(`
       CREATE TABLE IF NOT EXISTS schema_foreign_keys (
-        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        id INTEGER PRIMARY KEY,
         from_table TEXT NOT NULL,
         from_column TEXT NOT NULL,
         to_table TEXT NOT NULL,
@@ -212,6 +423,7 @@ export class IndexDatabase {
       );
       CREATE UNIQUE INDEX IF NOT EXISTS idx_kg_nodes_kind_key ON kg_nodes(kind, key);
       CREATE INDEX IF NOT EXISTS idx_kg_nodes_source ON kg_nodes(source);
+      CREATE INDEX IF NOT EXISTS idx_kg_nodes_file ON kg_nodes(file_path);
     `);
 
     // Knowledge Graph edges
@@ -234,93 +446,166 @@ export class IndexDatabase {
 
   // File operations
   upsertFile(file: FileRecord): number {
-    const stmt = this.db.prepare(`
-      INSERT INTO files (path, hash, last_indexed, file_type, line_count)
-      VALUES (@path, @hash, @last_indexed, @file_type, @line_count)
-      ON CONFLICT(path) DO UPDATE SET
-        hash = @hash,
-        last_indexed = @last_indexed,
-        file_type = @file_type,
-        line_count = @line_count
-      RETURNING id
-    `);
-    
-    const result = stmt.get(file) as { id: number };
+    const stmt = this.prepare(SQL_UPSERT_FILE);
+    const result = stmt.get({
+      ...file,
+      line_offsets: file.line_offsets ?? null,
+      size: file.size ?? null,
+      mtime_ms: file.mtime_ms ?? null
+    }) as { id: number };
     return result.id;
   }
 
-  getFile(filePath: string): FileRecord | null {
-    const stmt = this.db.prepare('SELECT * FROM files WHERE path = ?');
-    return stmt.get(filePath) as FileRecord | null;
-  }
-
-  getFileById(id: number): FileRecord | null {
-    const stmt = this.db.prepare('SELECT * FROM files WHERE id = ?');
-    return stmt.get(id) as FileRecord | null;
+  // Line offsets recorded when the file was indexed, with the size and
+  // mtime it had when read so callers can tell whether it has changed since
+  getLineOffsets(filePath: string): { line_offsets: Buffer; size: number; mtime_ms: number } | undefined {
+    const stmt = this.read(`
+      SELECT line_offsets, size, mtime_ms FROM files
+      WHERE path = ? AND line_offsets IS NOT NULL
+    `);
+    return stmt.get(filePath) as { line_offsets: Buffer; size: number; mtime_ms: number } | undefined;
   }
 
   deleteFile(filePath: string): void {
-    const stmt = this.db.prepare('DELETE FROM files WHERE path = ?');
+    const stmt = this.prepare('DELETE FROM files WHERE path = ?');
     stmt.run(filePath);
   }
 
+  // Drop a file that no longer exists along with the graph nodes parsed
+  // from it; their edges cascade
+  removeFile(filePath: string): void {
+    this.transaction(() => {
+      this.deleteFile(filePath);
+      this.prepare(`DELETE FROM kg_nodes WHERE source = 'ast' AND file_path = ?`).run(filePath);
+    });
+  }
+
   // Symbol operations
-  insertSymbol(symbol: Omit<SymbolRecord, 'id'>): number {
-    const stmt = this.db.prepare(`
-      INSERT INTO symbols (
-        file_id, name, type, parent_symbol, start_line, end_line,
-        signature, visibility, documentation
-      ) VALUES (
-        @file_id, @name, @type, @parent_symbol, @start_line, @end_line,
-        @signature, @visibility, @documentation
-      )
-    `);
-    
-    const result = stmt.run(symbol);
-    return result.lastInsertRowid as number;
+  // Bulk insert: prepare once, bind and step per row
+  insertSymbols(symbols: Omit<SymbolRecord, 'id'>[]): void {
+    if (symbols.length === 0) return;
+
+    const stmt = this.prepare(SQL_INSERT_SYMBOL);
+
+    for (const symbol of symbols) {
+      stmt.run(symbol);
+    }
   }
 
   getSymbolsForFile(fileId: number): SymbolRecord[] {
-    const stmt = this.db.prepare('SELECT * FROM symbols WHERE file_id = ? ORDER BY start_line');
+    const stmt = this.read('SELECT * FROM symbols WHERE file_id = ? ORDER BY start_line');
     return stmt.all(fileId) as SymbolRecord[];
   }
 
-  deleteSymbolsForFile(fileId: number): void {
-    const stmt = this.db.prepare('DELETE FROM symbols WHERE file_id = ?');
-    stmt.run(fileId);
+  searchSymbols(query: string, limit: number = 10, fileTypes?: string[]): any[] {
+    const { sql, params } = this.buildSymbolSearch(query, limit, fileTypes);
+    const rows = this.read(sql).all(...params);
+    if (rows.length >= limit || !fileTypes?.length) {
+      return rows;
+    }
+
+    // A rare file type can have fewer hits than asked for among the
+    // over-fetched candidates while more exist further down the ranking;
+    // only then is it worth filtering every match. Counting one hit past
+    // the cap tells whether the candidates were cut off at all.
+    const cap = limit * FILTERED_OVERFETCH;
+    const hits = this.read(
+      'SELECT COUNT(*) FROM (SELECT 1 FROM symbols_fts WHERE symbols_fts MATCH ? LIMIT ?)'
+    ).pluck().get(query, cap + 1) as number;
+    if (hits <= cap) {
+      return rows;
+    }
+
+    const unbounded = this.buildSymbolSearch(query, limit, fileTypes, -1);
+    return this.read(unbounded.sql).all(...unbounded.params);
   }
 
-  searchSymbols(query: string, limit: number = 10, fileTypes?: string[]): any[] {
+  /**
+   * Lazily yield search hits so callers that stop early never materialize
+   * the remaining rows. Uses its own statement: a cached one would be busy
+   * for as long as the iterator is open.
+   */
+  *iterateSymbols(query: string, limit: number = 10, fileTypes?: string[]): IterableIterator<any> {
+    const { sql, params } = this.buildSymbolSearch(query, limit, fileTypes);
+    yield* this.reader.prepare(sql).iterate(...params);
+  }
+
+  // candidates caps the FTS hits considered before filtering; -1 is no cap
+  private buildSymbolSearch(
+    query: string,
+    limit: number,
+    fileTypes?: string[],
+    candidates?: number
+  ): { sql: string; params: any[] } {
+    const filtered = !!fileTypes && fileTypes.length > 0;
+
+    // Resolve the MATCH in its own CTE so the planner keeps the FTS index
+    // path instead of mixing MATCH with join predicates. When filtering by
+    // file type, over-fetch candidates so enough survive the filter.
     let sql = `
+      WITH fts_hits AS (
+        SELECT
+          rowid,
+          rank,
+          snippet(symbols_fts, 0, '<mark>', '</mark>', '...', 32) as match_snippet
+        FROM symbols_fts
+        WHERE symbols_fts MATCH ?
+        ORDER BY rank
+        LIMIT ?
+      )
       SELECT 
         s.*,
         f.path as file_path,
         f.file_type,
-        snippet(symbols_fts, 0, '<mark>', '</mark>', '...', 32) as match_snippet
-      FROM symbols_fts
-      JOIN symbols s ON s.id = symbols_fts.rowid
+        h.match_snippet
+      FROM fts_hits h
+      JOIN symbols s ON s.id = h.rowid
       JOIN files f ON f.id = s.file_id
-      WHERE symbols_fts MATCH ?
     `;
 
-    const params: any[] = [query];
+    const params: any[] = [query, candidates ?? (filtered ? limit * FILTERED_OVERFETCH : limit)];
 
-    if (fileTypes && fileTypes.length > 0) {
-      const placeholders = fileTypes.map(() => '?').join(',');
-      sql += ` AND f.file_type IN (${placeholders})`;
-      params.push(...fileTypes);
+    if (filtered) {
+      const placeholders = fileTypes!.map(() => '?').join(',');
+      sql += ` WHERE f.file_type IN (${placeholders})`;
+      params.push(...fileTypes!);
     }
 
-    sql += ' ORDER BY rank LIMIT ?';
+    sql += ' ORDER BY h.rank LIMIT ?';
     params.push(limit);
 
-    const stmt = this.db.prepare(sql);
-    return stmt.all(...params);
+    return { sql, params };
+  }
+
+  // Line range of a named symbol in one file; only the columns getSnippet needs
+  findSymbolLines(filePath: string, symbolName: string): { start_line: number; end_line: number } | undefined {
+    const version = this.dataVersion();
+    if (version !== this.symbolLinesVersion) {
+      this.symbolLines.clear();
+      this.symbolLinesVersion = version;
+    }
+
+    const key = `${filePath}\0${symbolName}`;
+    if (this.symbolLines.has(key)) {
+      return this.symbolLines.get(key);
+    }
+
+    const stmt = this.read(`
+      SELECT s.start_line, s.end_line
+      FROM files f
+      JOIN symbols s ON s.file_id = f.id
+      WHERE f.path = ? AND s.name = ?
+      ORDER BY s.start_line
+      LIMIT 1
+    `);
+    const lines = stmt.get(filePath, symbolName) as { start_line: number; end_line: number } | undefined;
+    this.symbolLines.set(key, lines);
+    return lines;
   }
 
   // Call graph operations
   insertCall(call: Omit<CallRecord, 'id'>): void {
-    const stmt = this.db.prepare(`
+    const stmt = this.prepare(`
       INSERT INTO calls (caller_symbol_id, callee_symbol, line_number, call_type)
       VALUES (@caller_symbol_id, @callee_symbol, @line_number, @call_type)
     `);
@@ -328,12 +613,12 @@ export class IndexDatabase {
   }
 
   getCallsForSymbol(symbolId: number): CallRecord[] {
-    const stmt = this.db.prepare('SELECT * FROM calls WHERE caller_symbol_id = ?');
+    const stmt = this.read('SELECT * FROM calls WHERE caller_symbol_id = ?');
     return stmt.all(symbolId) as CallRecord[];
   }
 
   findCallers(symbolName: string): any[] {
-    const stmt = this.db.prepare(`
+    const stmt = this.read(`
       SELECT 
         s.*,
         f.path as file_path,
@@ -347,7 +632,7 @@ export class IndexDatabase {
   }
 
   findCallees(symbolId: number): any[] {
-    const stmt = this.db.prepare(`
+    const stmt = this.read(`
       SELECT 
         c.callee_symbol,
         c.line_number,
@@ -359,60 +644,170 @@ export class IndexDatabase {
   }
 
   // Utility methods
-  beginTransaction(): void {
-    this.db.prepare('BEGIN').run();
+
+  /**
+   * Run fn inside a single BEGIN IMMEDIATE transaction (one fsync for all
+   * of its writes). Rolls back if fn throws. fn must be synchronous.
+   */
+  transaction<T>(fn: () => T): T {
+    return this.db.transaction(fn).immediate();
+  }
+
+  /**
+   * Run a bulk load with the secondary symbol indexes and the FTS triggers
+   * dropped. Once fn settles the indexes are rebuilt in one pass and the
+   * FTS table is rebuilt from the symbols table.
+   */
+  async bulkLoad<T>(fn: () => Promise<T>): Promise<T> {
+    this.db.exec(SQL_DROP_SYMBOL_MAINTENANCE);
+
+    try {
+      return await fn();
+    } finally {
+      this.db.exec(SQL_SYMBOL_INDEXES);
+      this.db.exec(SQL_FTS_TRIGGERS);
+      this.db.exec(`INSERT INTO symbols_fts(symbols_fts) VALUES('rebuild')`);
+    }
   }
 
-  commit(): void {
-    this.db.prepare('COMMIT').run();
+  /**
+   * Build a fresh index in an in-memory staging database, then replace
+   * this database's contents with it in a single transaction. Metadata
+   * and parse cache entries written to the staging database are merged
+   * into this one.
+   */
+  async stagedLoad<T>(fn: (staging: IndexDatabase) => Promise<T>): Promise<T> {
+    const staging = new IndexDatabase(':memory:');
+    try {
+      // The staging copy never serves searches
+      staging.db.exec(SQL_DROP_SYMBOL_MAINTENANCE);
+      const result = await fn(staging);
+      await this.bulkLoad(async () => staging.copyInto(this.db.name));
+      return result;
+    } finally {
+      staging.close();
+    }
   }
 
-  rollback(): void {
-    this.db.prepare('ROLLBACK').run();
+  private copyInto(targetPath: string): void {
+    this.db.prepare('ATTACH DATABASE ? AS target').run(targetPath);
+    try {
+      this.transaction(() => {
+        for (const table of [...STAGED_TABLES].reverse()) {
+          this.db.exec(`DELETE FROM target.${table}`);
+        }
+        for (const table of STAGED_TABLES) {
+          const columns = (this.db.pragma(`table_info(${table})`) as any[])
+            .map(column => column.name)
+            .join(', ');
+          this.db.exec(`INSERT INTO target.${table} (${columns}) SELECT ${columns} FROM main.${table}`);
+        }
+        this.db.exec('INSERT OR REPLACE INTO target.metadata SELECT * FROM main.metadata');
+        this.db.exec('INSERT OR REPLACE INTO target.ast_cache SELECT * FROM main.ast_cache');
+      });
+    } finally {
+      this.db.exec('DETACH DATABASE target');
+    }
   }
 
   close(): void {
+    if (this.reader !== this.db) {
+      this.reader.close();
+    }
     this.db.close();
   }
 
-  // Additional methods for indexer
-  clearAll(): void {
-    this.db.prepare('DELETE FROM calls').run();
-    this.db.prepare('DELETE FROM symbols').run();
-    this.db.prepare('DELETE FROM files').run();
+  // Indexed paths beneath a directory relative to the repo root. '0' sorts
+  // right after '/', so the range is exactly the directory's contents and
+  // is served by the unique index on path.
+  findFilesUnder(dir: string): string[] {
+    const stmt = this.read('SELECT path FROM files WHERE path > ? AND path < ?').pluck();
+    return stmt.all(`${dir}/`, `${dir}0`) as string[];
+  }
+
+  // Paths of indexed files matching a JavaScript regular expression
+  findFilesByPattern(pattern: string): string[] {
+    const stmt = this.read('SELECT path FROM files WHERE path REGEXP ? ORDER BY path').pluck();
+    return stmt.all(pattern) as string[];
+  }
+
+  hasFiles(): boolean {
+    return this.read('SELECT EXISTS(SELECT 1 FROM files)').pluck().get() === 1;
   }
 
   getFileByPath(filePath: string): FileRecord | undefined {
-    const relativePath = filePath.includes('/') && !filePath.startsWith('/') ? 
-      filePath : 
-      filePath.replace(/^.*?\//, '');
-    const stmt = this.db.prepare('SELECT * FROM files WHERE path = ?');
+    // Paths are stored relative to the repo root; a leading slash is the
+    // only thing to strip
+    const relativePath = filePath.startsWith('/') ? filePath.slice(1) : filePath;
+    const stmt = this.read(`SELECT ${SQL_FILE_COLUMNS} FROM files WHERE path = ?`);
     return stmt.get(relativePath) as FileRecord | undefined;
   }
 
   // Get statistics
+  /**
+   * Token that changes whenever the indexed data may have changed:
+   * the reader's data_version moves when another connection, including
+   * the writer, commits; the writer's total_changes() covers the
+   * in-memory case, where both are one connection. Keys the read caches
+   * below and the indexer's snippet cache.
+   */
+  dataVersion(): string {
+    const version = this.read('SELECT data_version FROM pragma_data_version').pluck().get();
+    const changes = this.prepare('SELECT total_changes()').pluck().get();
+    return `${version}:${changes}`;
+  }
+
   getStats(): any {
-    const fileCount = this.db.prepare('SELECT COUNT(*) as count FROM files').get() as { count: number };
-    const symbolCount = this.db.prepare('SELECT COUNT(*) as count FROM symbols').get() as { count: number };
-    const callCount = this.db.prepare('SELECT COUNT(*) as count FROM calls').get() as { count: number };
-    
-    const typeStats = this.db.prepare(`
-      SELECT type, COUNT(*) as count 
-      FROM symbols 
-      GROUP BY type
-    `).all();
+    const version = this.dataVersion();
+    if (this.statsCache?.version === version) {
+      return this.statsCache.stats;
+    }
 
-    return {
-      files: fileCount.count,
-      symbols: symbolCount.count,
-      calls: callCount.count,
-      symbolTypes: typeStats
+    const row = this.read(`
+      SELECT
+        (SELECT COUNT(*) FROM files) AS files,
+        (SELECT COUNT(*) FROM symbols) AS symbols,
+        (SELECT COUNT(*) FROM calls) AS calls,
+        (
+          SELECT json_group_array(json_object('type', type, 'count', count))
+          FROM (SELECT type, COUNT(*) AS count FROM symbols GROUP BY type)
+        ) AS symbol_types,
+        (
+          SELECT json_group_object(COALESCE(file_type, 'other'), count)
+          FROM (SELECT file_type, COUNT(*) AS count FROM files GROUP BY file_type)
+        ) AS file_types
+    `).get() as { files: number; symbols: number; calls: number; symbol_types: string; file_types: string };
+
+    const stats = {
+      files: row.files,
+      symbols: row.symbols,
+      calls: row.calls,
+      symbolTypes: JSON.parse(row.symbol_types),
+      fileTypes: JSON.parse(row.file_types)
     };
+    this.statsCache = { version, stats };
+    return stats;
+  }
+
+  // Parse cache operations
+  getCachedParse(hash: string): string | undefined {
+    const stmt = this.read('SELECT result FROM ast_cache WHERE hash = ? AND format = ?').pluck();
+    return stmt.get(hash, AST_CACHE_FORMAT) as string | undefined;
+  }
+
+  cacheParse(hash: string, result: string): void {
+    this.prepare('INSERT OR REPLACE INTO ast_cache (hash, format, result) VALUES (?, ?, ?)')
+      .run(hash, AST_CACHE_FORMAT, result);
+  }
+
+  // Drop cached parses of content that is no longer indexed
+  pruneParseCache(): void {
+    this.prepare('DELETE FROM ast_cache WHERE hash NOT IN (SELECT hash FROM files)').run();
   }
 
   // Metadata operations
   setMetadata(key: string, value: string): void {
-    const stmt = this.db.prepare(`
+    const stmt = this.prepare(`
       INSERT INTO metadata (key, value, updated_at) 
       VALUES (?, ?, CURRENT_TIMESTAMP)
       ON CONFLICT(key) DO UPDATE SET 
@@ -423,38 +818,31 @@ export class IndexDatabase {
   }
 
   getMetadata(key: string): string | null {
-    const stmt = this.db.prepare('SELECT value FROM metadata WHERE key = ?');
-    const result = stmt.get(key) as { value: string } | undefined;
-    return result?.value || null;
+    const stmt = this.read('SELECT value FROM metadata WHERE key = ?').pluck();
+    const value = stmt.get(key) as string | undefined;
+    return value || null;
   }
 
   getAllMetadata(): Record<string, string> {
-    const stmt = this.db.prepare('SELECT key, value FROM metadata');
-    const rows = stmt.all() as Array<{ key: string; value: string }>;
-    const metadata: Record<string, string> = {};
-    for (const row of rows) {
-      metadata[row.key] = row.value;
-    }
-    return metadata;
+    // Positional [key, value] rows skip building an object per row
+    const stmt = this.read('SELECT key, value FROM metadata').raw();
+    return Object.fromEntries(stmt.all() as Array<[string, string]>);
   }
 
   // Check if database needs reindexing
   needsReindex(repoPath: string): boolean {
-    const storedPath = this.getMetadata('repo_path');
-    const lastIndexed = this.getMetadata('last_indexed');
-    
-    // Need reindex if:
-    // 1. No stored path (new database)
-    // 2. Different repo path
-    // 3. No files in database
-    // 4. Never indexed
-    if (!storedPath || storedPath !== repoPath) return true;
-    if (!lastIndexed) return true;
-    
-    const fileCount = this.db.prepare('SELECT COUNT(*) as count FROM files').get() as { count: number };
-    if (fileCount.count === 0) return true;
-    
-    return false;
+    // The index is usable only if it was built for this repo by a
+    // completed run of the current format and holds at least one file.
+    // A new, empty or foreign database fails one of the checks; EXISTS
+    // stops at the first file row instead of counting them all.
+    const usable = this.read(`
+      SELECT
+        (SELECT value FROM metadata WHERE key = 'repo_path') = ?
+        AND (SELECT value FROM metadata WHERE key = 'index_format_version') = ?
+        AND EXISTS (SELECT 1 FROM metadata WHERE key = 'last_indexed')
+        AND EXISTS (SELECT 1 FROM files)
+    `).pluck().get(repoPath, INDEX_FORMAT_VERSION);
+    return usable !== 1;
   }
 
   // Schema operations
@@ -468,7 +856,7 @@ export class IndexDatabase {
   }
 
   upsertSchemaTable(name: string, primaryKey?: string): number {
-    const stmt = this.db.prepare(`
+    const stmt = this.prepare(`
       INSERT INTO schema_tables (name, primary_key)
       VALUES (?, ?)
       ON CONFLICT(name) DO UPDATE SET
@@ -481,7 +869,7 @@ export class IndexDatabase {
   }
 
   insertSchemaColumn(tableId: number, column: any) {
-    const stmt = this.db.prepare(`
+    const stmt = this.prepare(`
       INSERT INTO schema_columns (
         table_id, name, column_type, nullable, 
         default_value, column_limit, precision, scale
@@ -509,7 +897,7 @@ export class IndexDatabase {
   }
 
   insertSchemaIndex(tableId: number, index: any) {
-    const stmt = this.db.prepare(`
+    const stmt = this.prepare(`
       INSERT INTO schema_indexes (
         table_id, name, columns, unique_index, where_clause
       )
@@ -526,7 +914,7 @@ export class IndexDatabase {
   }
 
   insertSchemaForeignKey(fk: any) {
-    const stmt = this.db.prepare(`
+    const stmt = this.prepare(`
       INSERT INTO schema_foreign_keys (
         from_table, from_column, to_table, to_column, on_delete, on_update
       )
@@ -544,17 +932,17 @@ export class IndexDatabase {
   }
 
   getSchemaTable(tableName: string): any {
-    const table = this.db.prepare(`
+    const table = this.read(`
       SELECT * FROM schema_tables WHERE name = ?
     `).get(tableName) as any;
     
     if (!table) return null;
     
-    const columns = this.db.prepare(`
+    const columns = this.read(`
       SELECT * FROM schema_columns WHERE table_id = ?
     `).all(table.id);
     
-    const indexes = this.db.prepare(`
+    const indexes = this.read(`
       SELECT * FROM schema_indexes WHERE table_id = ?
     `).all(table.id);
     
@@ -571,19 +959,19 @@ export class IndexDatabase {
   }
 
   getAllSchemaTables(): any[] {
-    return this.db.prepare(`
+    return this.read(`
       SELECT name, primary_key FROM schema_tables ORDER BY name
     `).all();
   }
 
   getSchemaForeignKeys(tableName?: string): any[] {
     if (tableName) {
-      return this.db.prepare(`
+      return this.read(`
         SELECT * FROM schema_foreign_keys 
         WHERE from_table = ? OR to_table = ?
       `).all(tableName, tableName);
     }
-    return this.db.prepare(`
+    return this.read(`
       SELECT * FROM schema_foreign_keys
     `).all();
   }
@@ -0,0 +1,179 @@
+/**
+ * Watches the repository for changed Ruby files and reports them in
+ * debounced batches, so an editor save or a branch switch becomes one
+ * incremental update rather than a rescan
+ */
+
+import * as fs from 'fs';
+import * as path from 'path';
+import { isExcludedPath } from './indexer.js';
+
+// Quiet period after the last change before a batch is reported
+const DEBOUNCE_MS = 250;
+
+export class FileWatcher {
+  private root: string;
+  private onChange: (paths: string[]) => Promise<void>;
+  // One non-recursive watch per directory, keyed relative to the root
+  // ('' for the root itself)
+  private watchers = new Map<string, fs.FSWatcher>();
+  private pending = new Set<string>();
+  private timer: NodeJS.Timeout | null = null;
+  private running = false;
+  private closed = false;
+
+  constructor(root: string, onChange: (paths: string[]) => Promise<void>) {
+    this.root = root;
+    this.onChange = onChange;
+  }
+
+  /**
+   * Start watching. Returns false when the root cannot be watched.
+   *
+   * Directories are walked here rather than by a recursive fs.watch, which
+   * on Linux walks synchronously and watches every file, excluded trees
+   * included. The indexer's exclusions apply at every depth, and each kept
+   * directory gets one watch. The walk below the root runs in the
+   * background.
+   */
+  start(): boolean {
+    try {
+      this.watch('');
+    } catch (error: any) {
+      console.error(`[FileWatcher] Cannot watch ${this.root}: ${error.message}`);
+      return false;
+    }
+    this.watchChildren('').catch(error => console.error('[FileWatcher] Failed to watch the tree:', error));
+    return true;
+  }
+
+  close(): void {
+    this.closed = true;
+    for (const watcher of this.watchers.values()) {
+      watcher.close();
+    }
+    this.watchers.clear();
+    if (this.timer) {
+      clearTimeout(this.timer);
+      this.timer = null;
+    }
+    this.pending.clear();
+  }
+
+  private watch(dir: string): void {
+    // Not persistent: the watcher alone must not keep the server alive
+    const watcher = fs.watch(path.join(this.root, dir), { persistent: false }, (_event, filename) => {
+      if (filename) {
+        this.changed(dir ? path.join(dir, filename) : filename).catch(error =>
+          console.error('[FileWatcher] Failed to handle a change:', error)
+        );
+      }
+    });
+    watcher.on('error', () => {
+      // The directory itself went away
+      if (dir) {
+        this.unwatchTree(dir);
+      } else {
+        console.error(`[FileWatcher] Watching ${this.root} stopped`);
+        this.close();
+      }
+    });
+    this.watchers.set(dir, watcher);
+  }
+
+  // Watch a directory and everything under it that is not excluded
+  private async watchTree(dir: string): Promise<void> {
+    if (this.closed || this.watchers.has(dir) || isExcludedPath(dir)) {
+      return;
+    }
+    try {
+      this.watch(dir);
+    } catch (error: any) {
+      // Removed before it could be watched
+      if (error.code === 'ENOENT' || error.code === 'ENOTDIR') return;
+      throw error;
+    }
+    await this.watchChildren(dir);
+  }
+
+  private async watchChildren(dir: string): Promise<void> {
+    let entries: fs.Dirent[];
+    try {
+      entries = await fs.promises.readdir(path.join(this.root, dir), { withFileTypes: true });
+    } catch (error: any) {
+      if (error.code === 'ENOENT' || error.code === 'ENOTDIR') return;
+      throw error;
+    }
+    for (const entry of entries) {
+      if (entry.isDirectory()) {
+        await this.watchTree(dir ? path.join(dir, entry.name) : entry.name);
+      }
+    }
+  }
+
+  // Drop the watches on a directory and everything under it
+  private unwatchTree(dir: string): void {
+    for (const [watched, watcher] of this.watchers) {
+      if (watched === dir || watched.startsWith(dir + path.sep)) {
+        watcher.close();
+        this.watchers.delete(watched);
+      }
+    }
+  }
+
+  // Ruby sources are reported, and so are directories created, moved in,
+  // moved away or deleted, which the indexer rescans as a whole
+  private async changed(relativePath: string): Promise<void> {
+    if (this.closed || isExcludedPath(relativePath)) {
+      return;
+    }
+
+    if (!relativePath.endsWith('.rb')) {
+      let isDirectory = false;
+      try {
+        isDirectory = (await fs.promises.stat(path.join(this.root, relativePath))).isDirectory();
+      } catch {
+        // Gone
+      }
+      if (isDirectory) {
+        await this.watchTree(relativePath);
+      } else if (this.watchers.has(relativePath)) {
+        this.unwatchTree(relativePath);
+      } else {
+        return;
+      }
+    }
+
+    this.pending.add(relativePath);
+    this.schedule();
+  }
+
+  private schedule(): void {
+    if (this.timer) {
+      clearTimeout(this.timer);
+    }
+    this.timer = setTimeout(() => this.flush(), DEBOUNCE_MS);
+  }
+
+  // One batch at a time; changes arriving meanwhile form the next batch
+  private async flush(): Promise<void> {
+    this.timer = null;
+    if (this.running || this.pending.size === 0) {
+      return;
+    }
+
+    const paths = [...this.pending];
+    this.pending.clear();
+    this.running = true;
+    try {
+      await this.onChange(paths);
+    } catch (error) {
+      console.error('[FileWatcher] Failed to apply changes:', error);
+    } finally {
+      this.running = false;
+      if (this.pending.size > 0) {
+        this.schedule();
+      }
+    }
+  }
+}
@@ -19,7 +19,7 @@ export class GraphBuilder {
   /**
    * Build graph from AST parse result
    */
-  async buildFromAST(filePath: string, parseResult: any, fileId: number): Promise<void> {
+  buildFromAST(filePath: string, parseResult: any, fileId: number): void {
     const relativePath = filePath;
     
     // Create file node
@@ -38,22 +38,22 @@ export class GraphBuilder {
     // Process symbols
     if (parseResult.symbols) {
       for (const symbol of parseResult.symbols) {
-        await this.processSymbol(symbol, fileNodeId, relativePath);
+        this.processSymbol(symbol, fileNodeId, relativePath);
       }
     }
 
     // Process Rails associations
     if (parseResult.associations) {
-      await this.processRailsAssociations(parseResult.associations, fileNodeId, relativePath);
+      this.processRailsAssociations(parseResult.associations, fileNodeId, relativePath);
     }
 
     // Process dependencies (requires, includes, extends)
     if (parseResult.dependencies) {
-      await this.processDependencies(parseResult.dependencies, fileNodeId, relativePath);
+      this.processDependencies(parseResult.dependencies, fileNodeId, relativePath);
     }
   }
 
-  private async processSymbol(symbol: any, fileNodeId: number, filePath: string): Promise<void> {
+  private processSymbol(symbol: any, fileNodeId: number, filePath: string): void {
     // Build node key based on symbol type and hierarchy
     const nodeKey = this.buildSymbolKey(symbol);
     
@@ -103,19 +103,19 @@ export class GraphBuilder {
 
     // Handle inheritance
     if (symbol.superclass && symbol.type === 'class') {
-      await this.createInheritanceEdge(symbolNodeId, symbol.superclass, filePath, symbol.start_line);
+      this.createInheritanceEdge(symbolNodeId, symbol.superclass, filePath, symbol.start_line);
     }
 
     // Handle module includes/extends
     if (symbol.includes) {
       for (const includedModule of symbol.includes) {
-        await this.createIncludeEdge(symbolNodeId, includedModule, filePath, symbol.start_line);
+        this.createIncludeEdge(symbolNodeId, includedModule, filePath, symbol.start_line);
       }
     }
 
     if (symbol.extends) {
       for (const extendedModule of symbol.extends) {
-        await this.createExtendEdge(symbolNodeId, extendedModule, filePath, symbol.start_line);
+        this.createExtendEdge(symbolNodeId, extendedModule, filePath, symbol.start_line);
       }
     }
   }
@@ -132,7 +132,7 @@ export class GraphBuilder {
     return symbol.name;
   }
 
-  private async createInheritanceEdge(childId: number, superclass: string, filePath: string, line: number): Promise<void> {
+  private createInheritanceEdge(childId: number, superclass: string, filePath: string, line: number): void {
     // Try to find or create the superclass node
     let parentNodeId = this.nodeCache.get(superclass);
     
@@ -156,7 +156,7 @@ export class GraphBuilder {
     });
   }
 
-  private async createIncludeEdge(classId: number, moduleName: string, filePath: string, line: number): Promise<void> {
+  private createIncludeEdge(classId: number, moduleName: string, filePath: string, line: number): void {
     let moduleNodeId = this.nodeCache.get(moduleName);
     
     if (!moduleNodeId) {
@@ -178,7 +178,7 @@ export class GraphBuilder {
     });
   }
 
-  private async createExtendEdge(classId: number, moduleName: string, filePath: string, line: number): Promise<void> {
+  private createExtendEdge(classId: number, moduleName: string, filePath: string, line: number): void {
     let moduleNodeId = this.nodeCache.get(moduleName);
     
     if (!moduleNodeId) {
@@ -200,7 +200,7 @@ export class GraphBuilder {
     });
   }
 
-  private async processRailsAssociations(associations: any[], fileNodeId: number, filePath: string): Promise<void> {
+  private processRailsAssociations(associations: any[], fileNodeId: number, filePath: string): void {
     for (const assoc of associations) {
       // Get the model node (should already exist from symbol processing)
       const modelKey = assoc.class_name || assoc.model_name;
@@ -256,7 +256,7 @@ export class GraphBuilder {
     return null;
   }
 
-  private async processDependencies(dependencies: any[], fileNodeId: number, filePath: string): Promise<void> {
+  private processDependencies(dependencies: any[], fileNodeId: number, filePath: string): void {
     for (const dep of dependencies) {
       if (dep.type === 'require' || dep.type === 'require_relative') {
         // Handle file dependencies
@@ -284,7 +284,7 @@ export class GraphBuilder {
   /**
    * Build graph from database schema
    */
-  async buildFromSchema(schemaTables: any[]): Promise<void> {
+  buildFromSchema(schemaTables: any[]): void {
     for (const table of schemaTables) {
       // Create table node
       const tableNodeId = this.graph.upsertNode({
@@ -346,7 +346,7 @@ export class GraphBuilder {
       // Create backs edge between model and table
       const modelName = this.tableNameToModelName(table.name);
       const modelNode = this.nodeCache.get(modelName) || 
-        (this.graph as any).getNodeByKey?.('class', modelName);
+        this.graph.getNodeByKey('class', modelName);
 
       if (modelNode) {
         const modelNodeId = typeof modelNode === 'number' ? modelNode : modelNode.id!;
@@ -407,6 +407,14 @@ export class GraphBuilder {
     return modelName;
   }
 
+  /**
+   * Forget cached node ids. Called when a transaction rolls back, since
+   * nodes it created are gone and their ids may be reused.
+   */
+  clearCache(): void {
+    this.nodeCache.clear();
+  }
+
   /**
    * Clear and reset the graph
    */
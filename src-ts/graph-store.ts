@@ -26,26 +26,85 @@ export interface KGEdge {
   meta_json?: any;
 }
 
+/**
+ * Defer parsing a row's meta_json until it is first read. The getter is
+ * enumerable, so JSON.stringify and object spread still see the parsed value.
+ */
+function withLazyMeta<T>(row: any): T {
+  const raw: string | null = row.meta_json;
+  let parsed: any;
+  Object.defineProperty(row, 'meta_json', {
+    enumerable: true,
+    configurable: true,
+    get() {
+      if (parsed === undefined) {
+        parsed = raw ? JSON.parse(raw) : {};
+      }
+      return parsed;
+    },
+    set(value) {
+      parsed = value;
+    }
+  });
+  return row;
+}
+
+// Nulls are dropped on write (readers treat a missing key the same way),
+// which keeps the mostly-sparse property blobs small on disk
+function serializeMeta(meta: any): string {
+  if (typeof meta !== 'object' || meta === null) {
+    return meta || '{}';
+  }
+  return JSON.stringify(meta, (_key, value) => value === null ? undefined : value);
+}
+
 export interface GraphStore {
   upsertNode(n: KGNode): number;
   upsertEdge(e: KGEdge): number;
   findNodes(opts: { kind?: string; q?: string; limit?: number }): KGNode[];
   neighbors(nodeId: number, edgeKinds?: string[], dir?: "out" | "in" | "both", depth?: number): { nodes: KGNode[]; edges: KGEdge[] };
   getNode(id: number): KGNode | null;
+  getNodeByKey(kind: string, key: string): KGNode | null;
   clearGraph(): void;
 }
 
 export class SQLiteGraphStore implements GraphStore {
   private db: Database.Database;
+  private statements = new Map<string, Database.Statement>();
+  // Queries serving tool calls go through the index's read-only
+  // connection, so they never queue behind a reindex holding the writer
+  private reader: Database.Database;
+  private readerStatements: Map<string, Database.Statement>;
 
-  constructor(db: Database.Database) {
+  constructor(db: Database.Database, reader: Database.Database = db) {
     this.db = db;
+    this.reader = reader;
+    this.readerStatements = reader === db ? this.statements : new Map();
+  }
+
+  // Reuse prepared statements across calls; upserts run once per symbol
+  private prepare(sql: string): Database.Statement {
+    let stmt = this.statements.get(sql);
+    if (!stmt) {
+      stmt = this.db.prepare(sql);
+      this.statements.set(sql, stmt);
+    }
+    return stmt;
+  }
+
+  private read(sql: string): Database.Statement {
+    let stmt = this.readerStatements.get(sql);
+    if (!stmt) {
+      stmt = this.reader.prepare(sql);
+      this.readerStatements.set(sql, stmt);
+    }
+    return stmt;
   }
 
   upsertNode(n: KGNode): number {
-    const meta = typeof n.meta_json === 'object' ? JSON.stringify(n.meta_json) : (n.meta_json || '{}');
+    const meta = serializeMeta(n.meta_json);
     
-    const stmt = this.db.prepare(`
+    const stmt = this.prepare(`
       INSERT INTO kg_nodes (kind, key, label, source, file_path, start_line, end_line, meta_json)
       VALUES (@kind, @key, @label, @source, @file_path, @start_line, @end_line, @meta)
       ON CONFLICT(kind, key) DO UPDATE SET
@@ -73,9 +132,9 @@ export class SQLiteGraphStore implements GraphStore {
   }
 
   upsertEdge(e: KGEdge): number {
-    const meta = typeof e.meta_json === 'object' ? JSON.stringify(e.meta_json) : (e.meta_json || '{}');
+    const meta = serializeMeta(e.meta_json);
     
-    const stmt = this.db.prepare(`
+    const stmt = this.prepare(`
       INSERT INTO kg_edges (kind, src_id, dst_id, src_loc, dst_loc, meta_json)
       VALUES (@kind, @src_id, @dst_id, @src_loc, @dst_loc, @meta)
       ON CONFLICT(kind, src_id, dst_id) DO UPDATE SET
@@ -116,13 +175,10 @@ export class SQLiteGraphStore implements GraphStore {
     sql += ' ORDER BY kind, key LIMIT ?';
     params.push(limit);
     
-    const stmt = this.db.prepare(sql);
+    const stmt = this.read(sql);
     const rows = stmt.all(...params) as any[];
     
-    return rows.map(row => ({
-      ...row,
-      meta_json: row.meta_json ? JSON.parse(row.meta_json) : {}
-    }));
+    return rows.map(row => withLazyMeta<KGNode>(row));
   }
 
   neighbors(
@@ -169,15 +225,12 @@ export class SQLiteGraphStore implements GraphStore {
           params.push(...edgeKinds);
         }
         
-        const outEdges = this.db.prepare(edgeSql).all(...params) as any[];
+        const outEdges = this.read(edgeSql).all(...params) as any[];
         
         for (const edge of outEdges) {
           if (!visitedEdges.has(edge.id)) {
             visitedEdges.add(edge.id);
-            edges.push({
-              ...edge,
-              meta_json: edge.meta_json ? JSON.parse(edge.meta_json) : {}
-            });
+            edges.push(withLazyMeta<KGEdge>(edge));
             
             if (!visitedNodes.has(edge.dst_id)) {
               visitedNodes.add(edge.dst_id);
@@ -202,15 +255,12 @@ export class SQLiteGraphStore implements GraphStore {
           params.push(...edgeKinds);
         }
         
-        const inEdges = this.db.prepare(edgeSql).all(...params) as any[];
+        const inEdges = this.read(edgeSql).all(...params) as any[];
         
         for (const edge of inEdges) {
           if (!visitedEdges.has(edge.id)) {
             visitedEdges.add(edge.id);
-            edges.push({
-              ...edge,
-              meta_json: edge.meta_json ? JSON.parse(edge.meta_json) : {}
-            });
+            edges.push(withLazyMeta<KGEdge>(edge));
             
             if (!visitedNodes.has(edge.src_id)) {
               visitedNodes.add(edge.src_id);
@@ -229,33 +279,28 @@ export class SQLiteGraphStore implements GraphStore {
   }
 
   getNode(id: number): KGNode | null {
-    const stmt = this.db.prepare('SELECT * FROM kg_nodes WHERE id = ?');
+    const stmt = this.read('SELECT * FROM kg_nodes WHERE id = ?');
     const row = stmt.get(id) as any;
     
     if (!row) return null;
     
-    return {
-      ...row,
-      meta_json: row.meta_json ? JSON.parse(row.meta_json) : {}
-    };
+    return withLazyMeta<KGNode>(row);
   }
 
   clearGraph(): void {
-    this.db.prepare('DELETE FROM kg_edges').run();
-    this.db.prepare('DELETE FROM kg_nodes').run();
+    this.prepare('DELETE FROM kg_edges').run();
+    this.prepare('DELETE FROM kg_nodes').run();
   }
 
-  // Helper method to get node by kind and key
+  // Helper method to get node by kind and key. Uses the writer: the graph
+  // builder looks up nodes written earlier in its own open transaction.
   getNodeByKey(kind: string, key: string): KGNode | null {
-    const stmt = this.db.prepare('SELECT * FROM kg_nodes WHERE kind = ? AND key = ?');
+    const stmt = this.prepare('SELECT * FROM kg_nodes WHERE kind = ? AND key = ?');
     const row = stmt.get(kind, key) as any;
     
     if (!row) return null;
     
-    return {
-      ...row,
-      meta_json: row.meta_json ? JSON.parse(row.meta_json) : {}
-    };
+    return withLazyMeta<KGNode>(row);
   }
 
   // Get all edges for a node
@@ -268,28 +313,25 @@ export class SQLiteGraphStore implements GraphStore {
       params.push(kind);
     }
     
-    const stmt = this.db.prepare(sql);
+    const stmt = this.read(sql);
     const rows = stmt.all(...params) as any[];
     
-    return rows.map(row => ({
-      ...row,
-      meta_json: row.meta_json ? JSON.parse(row.meta_json) : {}
-    }));
+    return rows.map(row => withLazyMeta<KGEdge>(row));
   }
 
   // Get statistics
   getGraphStats(): any {
-    const nodeCount = this.db.prepare('SELECT COUNT(*) as count FROM kg_nodes').get() as { count: number };
-    const edgeCount = this.db.prepare('SELECT COUNT(*) as count FROM kg_edges').get() as { count: number };
+    const nodeCount = this.read('SELECT COUNT(*) FROM kg_nodes').pluck().get() as number;
+    const edgeCount = this.read('SELECT COUNT(*) FROM kg_edges').pluck().get() as number;
     
-    const nodeKindStats = this.db.prepare(`
+    const nodeKindStats = this.read(`
       SELECT kind, COUNT(*) as count 
       FROM kg_nodes 
       GROUP BY kind
       ORDER BY count DESC
     `).all();
     
-    const edgeKindStats = this.db.prepare(`
+    const edgeKindStats = this.read(`
       SELECT kind, COUNT(*) as count 
       FROM kg_edges 
       GROUP BY kind
@@ -297,8 +339,8 @@ export class SQLiteGraphStore implements GraphStore {
     `).all();
     
     return {
-      nodes: nodeCount.count,
-      edges: edgeCount.count,
+      nodes: nodeCount,
+      edges: edgeCount,
       nodeKinds: nodeKindStats,
       edgeKinds: edgeKindStats
     };
@@ -16,7 +16,8 @@ import {
 } from '@modelcontextprotocol/sdk/types.js';
 import { z } from 'zod';
 import { CodeIndexer } from './indexer.js';
-import { IndexDatabase } from './database.js';
+import { IndexDatabase, INDEX_FORMAT_VERSION } from './database.js';
+import { FileWatcher } from './file-watcher.js';
 import * as path from 'path';
 import * as fs from 'fs';
 import { fileURLToPath } from 'url';
@@ -54,7 +55,8 @@ const FindTestsSchema = z.object({
 
 const ReindexSchema = z.object({
   paths: z.array(z.string()).optional().describe('Paths to reindex'),
-  full: z.boolean().default(false).describe('Full reindex')
+  full: z.boolean().default(false).describe('Full reindex'),
+  file_types: z.array(z.string()).optional().describe('Only reindex files of these types')
 });
 
 const DbTableSchema = z.object({
@@ -90,6 +92,270 @@ const ListRailsSchema = z.object({
   kind: z.enum(['associations', 'validations', 'callbacks', 'all']).default('all')
 });
 
+const BatchSchema = z.object({
+  calls: z.array(z.object({
+    tool: z.string().describe('Tool name'),
+    arguments: z.record(z.unknown()).optional().describe('Tool arguments')
+  })).min(1).describe('Independent tool calls to run together')
+});
+
+// Tool definitions advertised by list_tools
+const TOOLS: Tool[] = [
+  {
+    name: 'search_symbols',
+    description: 'Search for symbols (classes, methods, modules) in the codebase',
+    inputSchema: {
+      type: 'object',
+      properties: {
+        query: { type: 'string', description: 'Search query' },
+        k: { type: 'number', description: 'Number of results to return', default: 10 },
+        file_types: { 
+          type: 'array', 
+          items: { type: 'string' },
+          description: 'File types to search'
+        }
+      },
+      required: ['query']
+    }
+  },
+  {
+    name: 'get_snippet',
+    description: 'Get a code snippet from a file',
+    inputSchema: {
+      type: 'object',
+      properties: {
+        file_path: { type: 'string', description: 'Path to the file' },
+        start_line: { type: 'number', description: 'Starting line number' },
+        end_line: { type: 'number', description: 'Ending line number (defaults to 400 lines from start_line)' },
+        symbol_name: { type: 'string', description: 'Name of symbol to extract' }
+      },
+      required: ['file_path']
+    }
+  },
+  {
+    name: 'call_graph',
+    description: 'Analyze method dependencies and call relationships',
+    inputSchema: {
+      type: 'object',
+      properties: {
+        symbol: { type: 'string', description: 'Symbol to analyze' },
+        direction: { 
+          type: 'string', 
+          enum: ['callers', 'callees', 'both'],
+          description: 'Direction of analysis',
+          default: 'both'
+        },
+        depth: { type: 'number', description: 'Depth of analysis', default: 2 }
+      },
+      required: ['symbol']
+    }
+  },
+  {
+    name: 'find_similar',
+    description: 'Find similar code patterns in the codebase',
+    inputSchema: {
+      type: 'object',
+      properties: {
+        code_snippet: { type: 'string', description: 'Code snippet to find similar patterns' },
+        k: { type: 'number', description: 'Number of results', default: 5 },
+        min_similarity: { type: 'number', description: 'Minimum similarity score', default: 0.7 }
+      },
+      required: ['code_snippet']
+    }
+  },
+  {
+    name: 'find_tests',
+    description: 'Find test files for a given implementation file',
+    inputSchema: {
+      type: 'object',
+      properties: {
+        file_path: { type: 'string', description: 'Implementation file path' }
+      },
+      required: ['file_path']
+    }
+  },
+  {
+    name: 'reindex',
+    description: 'Reindex the codebase or specific paths',
+    inputSchema: {
+      type: 'object',
+      properties: {
+        paths: { 
+          type: 'array',
+          items: { type: 'string' },
+          description: 'Paths to reindex'
+        },
+        full: { type: 'boolean', description: 'Full reindex', default: false },
+        file_types: {
+          type: 'array',
+          items: { type: 'string' },
+          description: 'Only reindex files of these types (model, controller, spec, ...); other files keep their current index entries'
+        }
+      }
+    }
+  },
+  {
+    name: 'get_index_status',
+    description: 'Get the current status of code indexing',
+    inputSchema: {
+      type: 'object',
+      properties: {}
+    }
+  },
+  {
+    name: 'db_tables',
+    description: 'List all database tables from schema.rb',
+    inputSchema: {
+      type: 'object',
+      properties: {}
+    }
+  },
+  {
+    name: 'db_table',
+    description: 'Get detailed information about a database table',
+    inputSchema: {
+      type: 'object',
+      properties: {
+        table_name: { type: 'string', description: 'Name of the table' }
+      },
+      required: ['table_name']
+    }
+  },
+  {
+    name: 'db_table_relations',
+    description: 'Get foreign key relationships for a table',
+    inputSchema: {
+      type: 'object',
+      properties: {
+        table_name: { type: 'string', description: 'Name of the table' }
+      },
+      required: ['table_name']
+    }
+  },
+  {
+    name: 'db_suggest_associations',
+    description: 'Suggest Rails associations and validations based on database schema',
+    inputSchema: {
+      type: 'object',
+      properties: {
+        table_name: { type: 'string', description: 'Name of the table' }
+      },
+      required: ['table_name']
+    }
+  },
+  // Graph navigation tools
+  {
+    name: 'graph_find_nodes',
+    description: 'Find nodes in the knowledge graph by kind, key, or label',
+    inputSchema: {
+      type: 'object',
+      properties: {
+        kind: { type: 'string', description: 'Node kind filter (class, module, method, table, column)' },
+        q: { type: 'string', description: 'Search query for node key or label' },
+        limit: { type: 'number', default: 50, description: 'Maximum results' }
+      }
+    }
+  },
+  {
+    name: 'graph_neighbors',
+    description: 'Get connected nodes and edges for a given node',
+    inputSchema: {
+      type: 'object',
+      properties: {
+        node_id: { type: 'number', description: 'Node ID to find neighbors for' },
+        edge_kinds: { 
+          type: 'array', 
+          items: { type: 'string' },
+          description: 'Filter by edge kinds (defines, inherits, includes, belongs_to, has_many, backs, etc.)' 
+        },
+        direction: { 
+          type: 'string', 
+          enum: ['out', 'in', 'both'], 
+          default: 'both',
+          description: 'Edge direction' 
+        },
+        depth: { type: 'number', default: 1, description: 'Traversal depth (max 3)' }
+      },
+      required: ['node_id']
+    }
+  },
+  {
+    name: 'graph_explain',
+    description: 'Get detailed explanation of a node and suggest next actions',
+    inputSchema: {
+      type: 'object',
+      properties: {
+        node_id: { type: 'number', description: 'Node ID to explain' }
+      },
+      required: ['node_id']
+    }
+  },
+  {
+    name: 'get_definition',
+    description: 'Get code definition with context for a symbol',
+    inputSchema: {
+      type: 'object',
+      properties: {
+        symbol_id: { type: 'number', description: 'Symbol ID from graph' },
+        context_before: { type: 'number', default: 2, description: 'Lines before' },
+        context_after: { type: 'number', default: 2, description: 'Lines after' }
+      },
+      required: ['symbol_id']
+    }
+  },
+  {
+    name: 'list_rails',
+    description: 'List Rails associations, validations, or callbacks for a class',
+    inputSchema: {
+      type: 'object',
+      properties: {
+        class_name: { type: 'string', description: 'Rails model class name' },
+        kind: { 
+          type: 'string', 
+          enum: ['associations', 'validations', 'callbacks', 'all'],
+          default: 'all',
+          description: 'Type of Rails metadata to list' 
+        }
+      },
+      required: ['class_name']
+    }
+  },
+  {
+    name: 'batch',
+    description: 'Run several independent tool calls at once and return their results in order',
+    inputSchema: {
+      type: 'object',
+      properties: {
+        calls: {
+          type: 'array',
+          items: {
+            type: 'object',
+            properties: {
+              tool: { type: 'string', description: 'Tool name' },
+              arguments: { type: 'object', description: 'Tool arguments' }
+            },
+            required: ['tool']
+          },
+          description: 'Independent tool calls to run together'
+        }
+      },
+      required: ['calls']
+    }
+  }
+];
+
+const LIST_TOOLS_RESULT = { tools: TOOLS };
+
+// Validates a tool's arguments and produces its response payload
+type ToolHandler = (args: unknown) => Promise<unknown>;
+
+// The one place tool payloads are encoded for the client. Compact, in
+// one pass: indentation repeats on every line and grows with nesting, so
+// on batches or graph neighborhoods it can outweigh the data itself.
+function formatPayload(payload: unknown): string {
+  return JSON.stringify(payload);
+}
+
 // Get __dirname for ES modules
 const __filename = fileURLToPath(import.meta.url);
 const __dirname = dirname(__filename);
@@ -100,6 +366,10 @@ export class RailsMcpServer {
   private db: IndexDatabase;
   private repoPath: string;
   private autoIndexOnStartup: boolean;
+  private watchFiles: boolean;
+  private watcher: FileWatcher | null = null;
+  private closed = false;
+  private toolHandlers: Map<string, ToolHandler>;
   private indexingStatus: {
     inProgress: boolean;
     startedAt?: Date;
@@ -146,6 +416,7 @@ export class RailsMcpServer {
     
     // Configuration options
     this.autoIndexOnStartup = process.env.AUTO_INDEX !== 'false'; // Default to true
+    this.watchFiles = process.env.WATCH_FILES !== 'false'; // Default to true
 
     // Ensure database directory exists
     const dbDir = path.dirname(dbPath);
@@ -170,568 +441,290 @@ export class RailsMcpServer {
       }
     );
 
+    this.toolHandlers = this.createToolHandlers();
     this.setupHandlers();
   }
 
   private setupHandlers() {
-    // List available tools
-    this.server.setRequestHandler(ListToolsRequestSchema, async () => {
-      return {
-        tools: [
-          {
-            name: 'search_symbols',
-            description: 'Search for symbols (classes, methods, modules) in the codebase',
-            inputSchema: {
-              type: 'object',
-              properties: {
-                query: { type: 'string', description: 'Search query' },
-                k: { type: 'number', description: 'Number of results to return', default: 10 },
-                file_types: { 
-                  type: 'array', 
-                  items: { type: 'string' },
-                  description: 'File types to search'
-                }
-              },
-              required: ['query']
-            }
-          },
-          {
-            name: 'get_snippet',
-            description: 'Get a code snippet from a file',
-            inputSchema: {
-              type: 'object',
-              properties: {
-                file_path: { type: 'string', description: 'Path to the file' },
-                start_line: { type: 'number', description: 'Starting line number' },
-                end_line: { type: 'number', description: 'Ending line number' },
-                symbol_name: { type: 'string', description: 'Name of symbol to extract' }
-              },
-              required: ['file_path']
-            }
-          },
-          {
-            name: 'call_graph',
-            description: 'Analyze method dependencies and call relationships',
-            inputSchema: {
-              type: 'object',
-              properties: {
-                symbol: { type: 'string', description: 'Symbol to analyze' },
-                direction: { 
-                  type: 'string', 
-                  enum: ['callers', 'callees', 'both'],
-                  description: 'Direction of analysis',
-                  default: 'both'
-                },
-                depth: { type: 'number', description: 'Depth of analysis', default: 2 }
-              },
-              required: ['symbol']
-            }
-          },
-          {
-            name: 'find_similar',
-            description: 'Find similar code patterns in the codebase',
-            inputSchema: {
-              type: 'object',
-              properties: {
-                code_snippet: { type: 'string', description: 'Code snippet to find similar patterns' },
-                k: { type: 'number', description: 'Number of results', default: 5 },
-                min_similarity: { type: 'number', description: 'Minimum similarity score', default: 0.7 }
-              },
-              required: ['code_snippet']
-            }
-          },
-          {
-            name: 'find_tests',
-            description: 'Find test files for a given implementation file',
-            inputSchema: {
-              type: 'object',
-              properties: {
-                file_path: { type: 'string', description: 'Implementation file path' }
-              },
-              required: ['file_path']
-            }
-          },
-          {
-            name: 'reindex',
-            description: 'Reindex the codebase or specific paths',
-            inputSchema: {
-              type: 'object',
-              properties: {
-                paths: { 
-                  type: 'array',
-                  items: { type: 'string' },
-                  description: 'Paths to reindex'
-                },
-                full: { type: 'boolean', description: 'Full reindex', default: false }
-              }
-            }
-          },
-          {
-            name: 'get_index_status',
-            description: 'Get the current status of code indexing',
-            inputSchema: {
-              type: 'object',
-              properties: {}
-            }
-          },
-          {
-            name: 'db_tables',
-            description: 'List all database tables from schema.rb',
-            inputSchema: {
-              type: 'object',
-              properties: {}
-            }
-          },
-          {
-            name: 'db_table',
-            description: 'Get detailed information about a database table',
-            inputSchema: {
-              type: 'object',
-              properties: {
-                table_name: { type: 'string', description: 'Name of the table' }
-              },
-              required: ['table_name']
-            }
-          },
-          {
-            name: 'db_table_relations',
-            description: 'Get foreign key relationships for a table',
-            inputSchema: {
-              type: 'object',
-              properties: {
-                table_name: { type: 'string', description: 'Name of the table' }
-              },
-              required: ['table_name']
-            }
-          },
-          {
-            name: 'db_suggest_associations',
-            description: 'Suggest Rails associations and validations based on database schema',
-            inputSchema: {
-              type: 'object',
-              properties: {
-                table_name: { type: 'string', description: 'Name of the table' }
-              },
-              required: ['table_name']
-            }
-          },
-          // Graph navigation tools
-          {
-            name: 'graph_find_nodes',
-            description: 'Find nodes in the knowledge graph by kind, key, or label',
-            inputSchema: {
-              type: 'object',
-              properties: {
-                kind: { type: 'string', description: 'Node kind filter (class, module, method, table, column)' },
-                q: { type: 'string', description: 'Search query for node key or label' },
-                limit: { type: 'number', default: 50, description: 'Maximum results' }
-              }
-            }
-          },
-          {
-            name: 'graph_neighbors',
-            description: 'Get connected nodes and edges for a given node',
-            inputSchema: {
-              type: 'object',
-              properties: {
-                node_id: { type: 'number', description: 'Node ID to find neighbors for' },
-                edge_kinds: { 
-                  type: 'array', 
-                  items: { type: 'string' },
-                  description: 'Filter by edge kinds (defines, inherits, includes, belongs_to, has_many, backs, etc.)' 
-                },
-                direction: { 
-                  type: 'string', 
-                  enum: ['out', 'in', 'both'], 
-                  default: 'both',
-                  description: 'Edge direction' 
-                },
-                depth: { type: 'number', default: 1, description: 'Traversal depth (max 3)' }
-              },
-              required: ['node_id']
-            }
-          },
-          {
-            name: 'graph_explain',
-            description: 'Get detailed explanation of a node and suggest next actions',
-            inputSchema: {
-              type: 'object',
-              properties: {
-                node_id: { type: 'number', description: 'Node ID to explain' }
-              },
-              required: ['node_id']
-            }
-          },
-          {
-            name: 'get_definition',
-            description: 'Get code definition with context for a symbol',
-            inputSchema: {
-              type: 'object',
-              properties: {
-                symbol_id: { type: 'number', description: 'Symbol ID from graph' },
-                context_before: { type: 'number', default: 2, description: 'Lines before' },
-                context_after: { type: 'number', default: 2, description: 'Lines after' }
-              },
-              required: ['symbol_id']
-            }
-          },
-          {
-            name: 'list_rails',
-            description: 'List Rails associations, validations, or callbacks for a class',
-            inputSchema: {
-              type: 'object',
-              properties: {
-                class_name: { type: 'string', description: 'Rails model class name' },
-                kind: { 
-                  type: 'string', 
-                  enum: ['associations', 'validations', 'callbacks', 'all'],
-                  default: 'all',
-                  description: 'Type of Rails metadata to list' 
-                }
-              },
-              required: ['class_name']
-            }
-          }
-        ] as Tool[]
-      };
-    });
+    // The tool list never changes, so every request gets the same object
+    this.server.setRequestHandler(ListToolsRequestSchema, async () => LIST_TOOLS_RESULT);
 
     // Handle tool calls
     this.server.setRequestHandler(CallToolRequestSchema, async (request) => {
       const { name, arguments: args } = request.params;
 
-      try {
-        switch (name) {
-          case 'search_symbols': {
-            const params = SearchSymbolsSchema.parse(args);
-            
-            // Add warning if indexing is in progress
-            const warning = this.indexingStatus.inProgress ? 
-              'Note: Indexing is currently in progress. Results may be incomplete.\n\n' : '';
-            
-            const results = await this.indexer.searchSymbols(
-              params.query,
-              params.k,
-              params.file_types
-            );
-            
-            return {
-              content: [{
-                type: 'text',
-                text: warning + JSON.stringify(results, null, 2)
-              } as TextContent]
-            };
-          }
-
-          case 'get_snippet': {
-            const params = GetSnippetSchema.parse(args);
-            const snippet = await this.indexer.getSnippet(
-              params.file_path,
-              params.start_line,
-              params.end_line,
-              params.symbol_name
-            );
-            return {
-              content: [{
-                type: 'text',
-                text: JSON.stringify(snippet, null, 2)
-              } as TextContent]
-            };
-          }
-
-          case 'call_graph': {
-            const params = CallGraphSchema.parse(args);
-            const graph = await this.indexer.callGraph(
-              params.symbol,
-              params.direction,
-              params.depth
-            );
-            return {
-              content: [{
-                type: 'text',
-                text: JSON.stringify(graph, null, 2)
-              } as TextContent]
-            };
-          }
-
-          case 'find_similar': {
-            const params = FindSimilarSchema.parse(args);
-            const similar = await this.indexer.findSimilar(
-              params.code_snippet,
-              params.k,
-              params.min_similarity
-            );
-            return {
-              content: [{
-                type: 'text',
-                text: JSON.stringify(similar, null, 2)
-              } as TextContent]
-            };
-          }
+      const handler = this.toolHandlers.get(name);
+      if (!handler) {
+        throw new McpError(
+          ErrorCode.MethodNotFound,
+          `Unknown tool: ${name}`
+        );
+      }
 
-          case 'find_tests': {
-            const params = FindTestsSchema.parse(args);
-            const tests = await this.indexer.findTests(params.file_path);
-            return {
-              content: [{
-                type: 'text',
-                text: JSON.stringify(tests, null, 2)
-              } as TextContent]
-            };
-          }
+      try {
+        const result = await handler(args);
+        return {
+          content: [{
+            type: 'text',
+            // Handlers that compose their own text return it as is
+            text: typeof result === 'string' ? result : formatPayload(result)
+          } as TextContent]
+        };
+      } catch (error) {
+        if (error instanceof z.ZodError) {
+          throw new McpError(
+            ErrorCode.InvalidParams,
+            `Invalid parameters: ${error.message}`
+          );
+        }
+        throw error;
+      }
+    });
+  }
 
-          case 'reindex': {
-            const params = ReindexSchema.parse(args);
-            // Update status for manual reindex
-            this.indexingStatus = {
-              inProgress: true,
-              startedAt: new Date(),
-              filesProcessed: 0
-            };
-            
-            try {
-              const result = await this.indexer.reindex(params.paths, params.full);
-              this.indexingStatus = {
-                inProgress: false,
-                completedAt: new Date(),
-                filesProcessed: result.filesIndexed,
-                totalFiles: result.filesProcessed
-              };
-              return {
-                content: [{
-                  type: 'text',
-                  text: JSON.stringify(result, null, 2)
-                } as TextContent]
-              };
-            } catch (error: any) {
-              this.indexingStatus = {
-                inProgress: false,
-                error: error.message
-              };
-              throw error;
-            }
-          }
+  /**
+   * Tool implementations by name. Each validates its own arguments and
+   * returns the payload to send back; built once so a call is one lookup.
+   */
+  private createToolHandlers(): Map<string, ToolHandler> {
+    return new Map<string, ToolHandler>([
+      ['search_symbols', async (args) => {
+        const params = SearchSymbolsSchema.parse(args);
+        const results = await this.indexer.searchSymbols(
+          params.query,
+          params.k,
+          params.file_types
+        );
+
+        // Add warning if indexing is in progress
+        if (this.indexingStatus.inProgress) {
+          return 'Note: Indexing is currently in progress. Results may be incomplete.\n\n' +
+            formatPayload(results);
+        }
+        return results;
+      }],
+
+      ['get_snippet', async (args) => {
+        const params = GetSnippetSchema.parse(args);
+        return this.indexer.getSnippet(
+          params.file_path,
+          params.start_line,
+          params.end_line,
+          params.symbol_name
+        );
+      }],
+
+      ['call_graph', async (args) => {
+        const params = CallGraphSchema.parse(args);
+        return this.indexer.callGraph(
+          params.symbol,
+          params.direction,
+          params.depth
+        );
+      }],
+
+      ['find_similar', async (args) => {
+        const params = FindSimilarSchema.parse(args);
+        return this.indexer.findSimilar(
+          params.code_snippet,
+          params.k,
+          params.min_similarity
+        );
+      }],
+
+      ['find_tests', async (args) => {
+        const params = FindTestsSchema.parse(args);
+        return this.indexer.findTests(params.file_path);
+      }],
+
+      ['reindex', async (args) => {
+        const params = ReindexSchema.parse(args);
+        // Update status for manual reindex
+        this.indexingStatus = {
+          inProgress: true,
+          startedAt: new Date(),
+          filesProcessed: 0
+        };
 
-          case 'get_index_status': {
-            const stats = this.db.getStats();
-            const metadata = this.db.getAllMetadata();
-            
-            const status = {
-              indexing: this.indexingStatus,
-              database: {
-                files: stats.files,
-                symbols: stats.symbols,
-                calls: stats.calls,
-                symbolTypes: stats.symbolTypes
-              },
-              lastIndexed: metadata.last_indexed,
-              repoPath: this.repoPath
-            };
-            
-            return {
-              content: [{
-                type: 'text',
-                text: JSON.stringify(status, null, 2)
-              } as TextContent]
-            };
-          }
+        try {
+          const result = await this.indexer.reindex(params.paths, params.full, params.file_types);
+          this.indexingStatus = {
+            inProgress: false,
+            completedAt: new Date(),
+            filesProcessed: result.filesIndexed,
+            totalFiles: result.filesProcessed
+          };
+          return result;
+        } catch (error: any) {
+          this.indexingStatus = {
+            inProgress: false,
+            error: error.message
+          };
+          throw error;
+        }
+      }],
+
+      ['get_index_status', async () => {
+        const stats = this.db.getStats();
+        const metadata = this.db.getAllMetadata();
+
+        return {
+          indexing: this.indexingStatus,
+          database: {
+            files: stats.files,
+            symbols: stats.symbols,
+            calls: stats.calls,
+            symbolTypes: stats.symbolTypes,
+            fileTypes: stats.fileTypes
+          },
+          lastIndexed: metadata.last_indexed,
+          repoPath: this.repoPath
+        };
+      }],
+
+      ['db_tables', async () => this.indexer.getTables()],
+
+      ['db_table', async (args) => {
+        const params = DbTableSchema.parse(args);
+        return this.indexer.getTable(params.table_name);
+      }],
+
+      ['db_table_relations', async (args) => {
+        const params = DbTableSchema.parse(args);
+        return this.indexer.getTableRelations(params.table_name);
+      }],
+
+      ['db_suggest_associations', async (args) => {
+        const params = DbTableSchema.parse(args);
+        return this.indexer.suggestAssociations(params.table_name);
+      }],
+
+      // Graph navigation tools
+      ['graph_find_nodes', async (args) => {
+        const params = GraphFindNodesSchema.parse(args);
+        return this.db.graph.findNodes({
+          kind: params.kind,
+          q: params.q,
+          limit: params.limit
+        });
+      }],
+
+      ['graph_neighbors', async (args) => {
+        const params = GraphNeighborsSchema.parse(args);
+        return this.db.graph.neighbors(
+          params.node_id,
+          params.edge_kinds,
+          params.direction,
+          params.depth
+        );
+      }],
+
+      ['graph_explain', async (args) => {
+        const params = GraphExplainSchema.parse(args);
+        const node = this.db.graph.getNode(params.node_id);
+        if (!node) {
+          throw new McpError(ErrorCode.InvalidParams, `Node ${params.node_id} not found`);
+        }
 
-          case 'db_tables': {
-            const tables = await this.indexer.getTables();
-            return {
-              content: [{
-                type: 'text',
-                text: JSON.stringify(tables, null, 2)
-              } as TextContent]
-            };
-          }
+        // Get some context about the node
+        const neighbors = this.db.graph.neighbors(params.node_id, undefined, 'both', 1);
+        let incoming = 0;
+        let outgoing = 0;
+        for (const edge of neighbors.edges) {
+          if (edge.dst_id === params.node_id) incoming++;
+          if (edge.src_id === params.node_id) outgoing++;
+        }
 
-          case 'db_table': {
-            const params = DbTableSchema.parse(args);
-            const table = await this.indexer.getTable(params.table_name);
-            return {
-              content: [{
-                type: 'text',
-                text: JSON.stringify(table, null, 2)
-              } as TextContent]
-            };
-          }
+        return {
+          node,
+          summary: `${node.kind} "${node.label || node.key}" ${node.source === 'ast' ? `from ${node.file_path}` : 'from database schema'}`,
+          location: node.file_path ? `${node.file_path}:${node.start_line}-${node.end_line}` : null,
+          connections: { incoming, outgoing },
+          suggested_next: [
+            'graph_neighbors to explore connections',
+            node.file_path ? 'get_definition to see code' : null,
+            node.kind === 'class' ? 'list_rails to see Rails metadata' : null
+          ].filter(Boolean)
+        };
+      }],
+
+      ['get_definition', async (args) => {
+        const params = GetDefinitionSchema.parse(args);
+        const node = this.db.graph.getNode(params.symbol_id);
+        if (!node || !node.file_path) {
+          throw new McpError(ErrorCode.InvalidParams, `No code definition for node ${params.symbol_id}`);
+        }
 
-          case 'db_table_relations': {
-            const params = DbTableSchema.parse(args);
-            const relations = await this.indexer.getTableRelations(params.table_name);
-            return {
-              content: [{
-                type: 'text',
-                text: JSON.stringify(relations, null, 2)
-              } as TextContent]
-            };
-          }
+        return this.indexer.getSnippet(
+          node.file_path,
+          Math.max(1, (node.start_line || 1) - params.context_before),
+          (node.end_line || node.start_line || 1) + params.context_after
+        );
+      }],
+
+      ['list_rails', async (args) => {
+        const params = ListRailsSchema.parse(args);
+        // Exact match hits the (kind, key) unique index; substring search
+        // is only a fallback for partial names
+        const classNode = this.db.graph.getNodeByKey('class', params.class_name) ??
+          this.db.graph.findNodes({ kind: 'class', q: params.class_name, limit: 1 })[0];
+
+        if (!classNode) {
+          throw new McpError(ErrorCode.InvalidParams, `Class ${params.class_name} not found`);
+        }
 
-          case 'db_suggest_associations': {
-            const params = DbTableSchema.parse(args);
-            const suggestions = await this.indexer.suggestAssociations(params.table_name);
-            return {
-              content: [{
-                type: 'text',
-                text: JSON.stringify(suggestions, null, 2)
-              } as TextContent]
-            };
-          }
+        const neighbors = this.db.graph.neighbors(classNode.id!, ['belongs_to', 'has_many', 'has_one'], 'out', 1);
 
-          // Graph navigation tools
-          case 'graph_find_nodes': {
-            const params = GraphFindNodesSchema.parse(args);
-            const nodes = this.db.graph.findNodes({
-              kind: params.kind,
-              q: params.q,
-              limit: params.limit
-            });
-            return {
-              content: [{
-                type: 'text',
-                text: JSON.stringify(nodes, null, 2)
-              } as TextContent]
-            };
-          }
+        const result: any = {
+          class: params.class_name,
+          file: classNode.file_path
+        };
 
-          case 'graph_neighbors': {
-            const params = GraphNeighborsSchema.parse(args);
-            const result = this.db.graph.neighbors(
-              params.node_id,
-              params.edge_kinds,
-              params.direction,
-              params.depth
-            );
-            return {
-              content: [{
-                type: 'text',
-                text: JSON.stringify(result, null, 2)
-              } as TextContent]
-            };
-          }
+        if (params.kind === 'associations' || params.kind === 'all') {
+          const labels = new Map(neighbors.nodes.map((n: any) => [n.id, n.label]));
+          result.associations = neighbors.edges.map((e: any) => ({
+            type: e.kind,
+            target: labels.get(e.dst_id),
+            meta: e.meta_json
+          }));
+        }
 
-          case 'graph_explain': {
-            const params = GraphExplainSchema.parse(args);
-            const node = this.db.graph.getNode(params.node_id);
-            if (!node) {
-              throw new McpError(ErrorCode.InvalidParams, `Node ${params.node_id} not found`);
-            }
-            
-            // Get some context about the node
-            const neighbors = this.db.graph.neighbors(params.node_id, undefined, 'both', 1);
-            
-            const explanation = {
-              node,
-              summary: `${node.kind} "${node.label || node.key}" ${node.source === 'ast' ? `from ${node.file_path}` : 'from database schema'}`,
-              location: node.file_path ? `${node.file_path}:${node.start_line}-${node.end_line}` : null,
-              connections: {
-                incoming: neighbors.edges.filter((e: any) => e.dst_id === params.node_id).length,
-                outgoing: neighbors.edges.filter((e: any) => e.src_id === params.node_id).length
-              },
-              suggested_next: [
-                'graph_neighbors to explore connections',
-                node.file_path ? 'get_definition to see code' : null,
-                node.kind === 'class' ? 'list_rails to see Rails metadata' : null
-              ].filter(Boolean)
-            };
-            
-            return {
-              content: [{
-                type: 'text',
-                text: JSON.stringify(explanation, null, 2)
-              } as TextContent]
-            };
-          }
+        // For now, validations and callbacks would need to be extracted from AST metadata
+        if (params.kind === 'validations' || params.kind === 'all') {
+          result.validations = classNode.meta_json?.validations || [];
+        }
 
-          case 'get_definition': {
-            const params = GetDefinitionSchema.parse(args);
-            const node = this.db.graph.getNode(params.symbol_id);
-            if (!node || !node.file_path) {
-              throw new McpError(ErrorCode.InvalidParams, `No code definition for node ${params.symbol_id}`);
-            }
-            
-            const snippet = await this.indexer.getSnippet(
-              node.file_path,
-              Math.max(1, (node.start_line || 1) - params.context_before),
-              (node.end_line || node.start_line || 1) + params.context_after
-            );
-            
-            return {
-              content: [{
-                type: 'text',
-                text: JSON.stringify(snippet, null, 2)
-              } as TextContent]
-            };
-          }
+        if (params.kind === 'callbacks' || params.kind === 'all') {
+          result.callbacks = classNode.meta_json?.callbacks || [];
+        }
 
-          case 'list_rails': {
-            const params = ListRailsSchema.parse(args);
-            // Find the class node
-            const nodes = this.db.graph.findNodes({
-              kind: 'class',
-              q: params.class_name,
-              limit: 1
-            });
-            
-            if (nodes.length === 0) {
-              throw new McpError(ErrorCode.InvalidParams, `Class ${params.class_name} not found`);
-            }
-            
-            const classNode = nodes[0];
-            const neighbors = this.db.graph.neighbors(classNode.id!, ['belongs_to', 'has_many', 'has_one'], 'out', 1);
-            
-            const result: any = {
-              class: params.class_name,
-              file: classNode.file_path
-            };
-            
-            if (params.kind === 'associations' || params.kind === 'all') {
-              result.associations = neighbors.edges.map((e: any) => ({
-                type: e.kind,
-                target: neighbors.nodes.find((n: any) => n.id === e.dst_id)?.label,
-                meta: e.meta_json
-              }));
-            }
-            
-            // For now, validations and callbacks would need to be extracted from AST metadata
-            if (params.kind === 'validations' || params.kind === 'all') {
-              result.validations = classNode.meta_json?.validations || [];
-            }
-            
-            if (params.kind === 'callbacks' || params.kind === 'all') {
-              result.callbacks = classNode.meta_json?.callbacks || [];
-            }
-            
-            return {
-              content: [{
-                type: 'text',
-                text: JSON.stringify(result, null, 2)
-              } as TextContent]
-            };
+        return result;
+      }],
+
+      ['batch', async (args) => {
+        const params = BatchSchema.parse(args);
+        // Calls run concurrently, so one waiting on file reads or the
+        // parser does not hold up the rest; each reports its own failure
+        const settled = await Promise.allSettled(params.calls.map(call => {
+          const handler = call.tool === 'batch' ? undefined : this.toolHandlers.get(call.tool);
+          if (!handler) {
+            return Promise.reject(new Error(`Unknown tool: ${call.tool}`));
           }
-
-          default:
-            throw new McpError(
-              ErrorCode.MethodNotFound,
-              `Unknown tool: ${name}`
-            );
-        }
-      } catch (error) {
-        if (error instanceof z.ZodError) {
-          throw new McpError(
-            ErrorCode.InvalidParams,
-            `Invalid parameters: ${error.message}`
-          );
-        }
-        throw error;
-      }
-    });
+          return handler(call.arguments ?? {});
+        }));
+
+        return settled.map((outcome, i) => outcome.status === 'fulfilled'
+          ? { tool: params.calls[i].tool, result: outcome.value }
+          : { tool: params.calls[i].tool, error: outcome.reason?.message ?? String(outcome.reason) });
+      }]
+    ]);
   }
 
   async start() {
     // CRITICAL: Establish MCP connection FIRST to avoid timeouts
     const transport = new StdioServerTransport();
+    // The client going away ends the session
+    this.server.onclose = () => this.shutdown();
     await this.server.connect(transport);
     console.error(`[Rails AST MCP] Server started for ${this.repoPath}`);
 
@@ -739,6 +732,7 @@ export class RailsMcpServer {
     if (this.autoIndexOnStartup) {
       // Use setImmediate to run indexing after current I/O events
       setImmediate(async () => {
+        if (this.closed) return;
         try {
           if (this.db.needsReindex(this.repoPath)) {
             this.indexingStatus = {
@@ -747,8 +741,11 @@ export class RailsMcpServer {
               filesProcessed: 0
             };
             console.error(`[Rails AST MCP] Background indexing started for ${this.repoPath}...`);
-            
-            const result = await this.indexer.reindex([], false);
+
+            // Unchanged files are normally skipped, but an index written in
+            // another format has to be rebuilt from scratch
+            const full = this.db.getMetadata('index_format_version') !== INDEX_FORMAT_VERSION;
+            const result = await this.indexer.reindex([], full);
             
             this.indexingStatus = {
               inProgress: false,
@@ -770,13 +767,59 @@ export class RailsMcpServer {
           console.error('[Rails AST MCP] Background indexing failed:', error);
           // Continue anyway - user can manually reindex
         }
+        // The client may have disconnected while indexing ran
+        if (this.closed) return;
+        this.startWatching();
       });
+    } else {
+      this.startWatching();
+    }
+  }
+
+  /**
+   * Stop watching, let the parser processes exit and close the database
+   */
+  shutdown() {
+    if (this.closed) return;
+    this.closed = true;
+
+    this.watcher?.close();
+    this.indexer.close();
+    try {
+      this.db.close();
+    } catch (error) {
+      console.error('[Rails AST MCP] Failed to close database:', error);
+    }
+  }
+
+  /**
+   * Keep the index current as files change, re-parsing only what changed.
+   * Started once the startup index is in place so the two never overlap.
+   */
+  private startWatching() {
+    if (!this.watchFiles || this.closed) return;
+
+    this.watcher = new FileWatcher(this.repoPath, async (paths) => {
+      const { updated, removed } = await this.indexer.updateFiles(paths);
+      if (updated > 0 || removed > 0) {
+        console.error(`[Rails AST MCP] Updated index for ${updated} changed and ${removed} removed files`);
+      }
+    });
+    if (!this.watcher.start()) {
+      this.watcher = null;
+      console.error('[Rails AST MCP] File watching unavailable; use the reindex tool to pick up changes');
     }
   }
 }
 
 // Main entry point
 const server = new RailsMcpServer();
+for (const signal of ['SIGINT', 'SIGTERM'] as const) {
+  process.on(signal, () => {
+    server.shutdown();
+    process.exit(0);
+  });
+}
 server.start().catch((error) => {
   console.error('Failed to start server:', error);
   process.exit(1);
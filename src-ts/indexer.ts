@@ -6,13 +6,263 @@
 import * as fs from 'fs';
 import * as path from 'path';
 import * as crypto from 'crypto';
+import * as os from 'os';
 import { glob } from 'glob';
-import { IndexDatabase } from './database.js';
-import { RubyParser, RubyParseResult } from './ruby-parser.js';
+import { IndexDatabase, SymbolRecord, INDEX_FORMAT_VERSION } from './database.js';
+import { RubyParseResult } from './ruby-parser.js';
+import { RegexParserPool } from './regex-parser-pool.js';
 import { NativeRubyParser, NativeParseResult } from './ruby-parser-native.js';
 import { SchemaParser } from './schema-parser.js';
 import { RailsAssociationMapper } from './rails-association-mapper.js';
 import { GraphBuilder } from './graph-builder.js';
+import { LruCache } from './lru-cache.js';
+
+// Rails file types as [directory, file suffix, type], checked in order.
+// Concerns come before the models and controllers directories holding
+// them. Plain prefix/suffix tests leave no regex backtracking on the
+// per-file path.
+const RAILS_FILE_RULES: Array<[string, string, string]> = [
+  ['app/controllers/concerns/', '.rb', 'concern'],
+  ['app/models/concerns/', '.rb', 'concern'],
+  ['app/models/', '.rb', 'model'],
+  ['app/controllers/', '.rb', 'controller'],
+  ['app/services/', '.rb', 'service'],
+  ['app/jobs/', '.rb', 'job'],
+  ['app/sidekiq/', '.rb', 'job'],
+  ['app/policies/', '.rb', 'policy'],
+  ['app/mailers/', '.rb', 'mailer'],
+  ['app/helpers/', '.rb', 'helper'],
+  ['spec/', '_spec.rb', 'spec'],
+  ['spec/', '_test.rb', 'spec'],
+  ['test/', '_spec.rb', 'spec'],
+  ['test/', '_test.rb', 'spec'],
+  ['db/migrate/', '.rb', 'migration']
+];
+
+// Directories never descended into when looking for Ruby sources. The
+// root-only ones are Rails' scratch directories, which share their names
+// with directories an app might legitimately nest deeper down.
+const EXCLUDED_DIRS = new Set(['vendor', 'node_modules', '.git', '.rails-index']);
+const EXCLUDED_ROOT_DIRS = new Set(['tmp', 'log']);
+
+// Whether a path relative to the repo root is, or lies under, a directory
+// the walk below skips
+export function isExcludedPath(relativePath: string): boolean {
+  const parts = relativePath.split(path.sep);
+  if (EXCLUDED_ROOT_DIRS.has(parts[0])) {
+    return true;
+  }
+  return parts.some(part => EXCLUDED_DIRS.has(part));
+}
+
+// Whether a path relative to the repo root is one the walk below would
+// have collected
+function isIndexedPath(relativePath: string): boolean {
+  return relativePath.endsWith('.rb') && !isExcludedPath(path.dirname(relativePath));
+}
+
+/**
+ * Collect the .rb files under root, pruning excluded directories before
+ * reading them rather than filtering their contents afterwards
+ */
+async function findRubyFiles(root: string, repoRoot: string): Promise<string[]> {
+  const files: string[] = [];
+  const pending = [root];
+
+  while (pending.length > 0) {
+    const dir = pending.pop()!;
+    let entries: fs.Dirent[];
+    try {
+      entries = await fs.promises.readdir(dir, { withFileTypes: true });
+    } catch (error: any) {
+      if (error.code === 'ENOENT' || error.code === 'ENOTDIR') continue;
+      throw error;
+    }
+
+    for (const entry of entries) {
+      if (entry.isDirectory()) {
+        if (EXCLUDED_DIRS.has(entry.name)) continue;
+        if (dir === repoRoot && EXCLUDED_ROOT_DIRS.has(entry.name)) continue;
+        pending.push(path.join(dir, entry.name));
+      } else if (entry.name.endsWith('.rb')) {
+        files.push(path.join(dir, entry.name));
+      }
+    }
+  }
+
+  return files;
+}
+
+// Symbol queries are reduced to their words before reaching FTS5, so Ruby
+// punctuation (Api::V1, self.find, User#save) is never read as query
+// syntax. A single word also matches the names it starts, the way an
+// autocomplete would (User finds UserMailer), served by the FTS prefix
+// index; exact matches score on both terms and rank first. Several words
+// match any of them, with symbols matching more of them ranked higher.
+// Returns null when the query has no words to search for.
+const QUERY_WORD_RE = /\w+/g;
+
+function symbolMatchQuery(query: string): string | null {
+  const words = query.match(QUERY_WORD_RE);
+  if (!words) {
+    return null;
+  }
+  if (words.length === 1) {
+    return `"${words[0]}" OR "${words[0]}"*`;
+  }
+  return words.map(word => `"${word}"`).join(' OR ');
+}
+
+// Candidates fetched per requested find_similar result before re-ranking
+const SIMILAR_CANDIDATE_FACTOR = 20;
+
+// Identifier-like tokens are the features find_similar compares
+const TOKEN_RE = /[A-Za-z_][A-Za-z0-9_]*[?!]?/g;
+
+// Yield features line by line so callers never join source into one string.
+// A plain exec loop on the shared regex, rather than matchAll, which clones
+// the regex and allocates an iterator per line. The scan position is kept
+// locally, so generators interleaving on TOKEN_RE cannot disturb each other.
+function* tokensOf(lines: Iterable<string>): Generator<string> {
+  for (const line of lines) {
+    let position = 0;
+    for (;;) {
+      TOKEN_RE.lastIndex = position;
+      const match = TOKEN_RE.exec(line);
+      if (match === null) break;
+      position = TOKEN_RE.lastIndex;
+      const token = match[0];
+      if (token.length > 2) {
+        yield token;
+      }
+    }
+  }
+}
+
+// Branch-free SWAR popcount: bit counts are summed in parallel within
+// 2-, 4- and 8-bit lanes, then the multiply adds the four byte counts
+function popcount32(word: number): number {
+  word = word - ((word >>> 1) & 0x55555555);
+  word = (word & 0x33333333) + ((word >>> 2) & 0x33333333);
+  word = (word + (word >>> 4)) & 0x0f0f0f0f;
+  return Math.imul(word, 0x01010101) >>> 24;
+}
+
+/**
+ * Jaccard similarity of a query token set against the tokens of each
+ * candidate. Candidates are never materialized as sets of strings: every
+ * distinct token gets a small integer id once per call (query tokens take
+ * the first ids, which double as bit positions), and each candidate is
+ * reduced to its distinct-token count plus a row of one contiguous bit
+ * matrix holding the query tokens it contains. Scoring is then a single
+ * pass over the matrix: the intersection is the row's popcount and the
+ * union follows from the two counts.
+ */
+function jaccardScores(query: Set<string>, candidates: Iterable<string>[]): number[] {
+  const ids = new Map<string, number>();
+  for (const token of query) {
+    ids.set(token, ids.size);
+  }
+  const queryTokens = ids.size;
+
+  const stride = Math.ceil(queryTokens / 32);
+  const matrix = new Uint32Array(candidates.length * stride);
+  const sizes = new Uint32Array(candidates.length);
+  // Row (plus one) that last counted each token id, so repeats within a
+  // candidate are skipped without a per-candidate set
+  const lastSeen: number[] = new Array(queryTokens).fill(0);
+
+  for (let row = 0; row < candidates.length; row++) {
+    const stamp = row + 1;
+    const offset = row * stride;
+    let size = 0;
+    for (const token of candidates[row]) {
+      let id = ids.get(token);
+      if (id === undefined) {
+        id = ids.size;
+        ids.set(token, id);
+        lastSeen.push(0);
+      }
+      if (lastSeen[id] === stamp) continue;
+      lastSeen[id] = stamp;
+      size++;
+      if (id < queryTokens) {
+        matrix[offset + (id >>> 5)] |= 1 << (id & 31);
+      }
+    }
+    sizes[row] = size;
+  }
+
+  const scores = new Array<number>(candidates.length);
+  for (let row = 0, offset = 0; row < candidates.length; row++, offset += stride) {
+    let shared = 0;
+    for (let i = offset; i < offset + stride; i++) {
+      shared += popcount32(matrix[i]);
+    }
+    const union = queryTokens + sizes[row] - shared;
+    scores[row] = union === 0 ? 0 : shared / union;
+  }
+  return scores;
+}
+
+// Lines returned by getSnippet when no end line is given
+const MAX_SNIPPET_LINES = 400;
+
+// Files whose line offsets are kept for snippet reads
+const LINE_INDEX_CACHE_SIZE = 256;
+
+// Recent getSnippet results, for clients that ask for the same code again
+const SNIPPET_CACHE_SIZE = 2048;
+
+interface LineIndex {
+  size: number;
+  mtimeMs: number;
+  // Byte offset where each line starts, followed by the end of the last line
+  offsets: Uint32Array;
+}
+
+function lineOffsets(data: Buffer): Uint32Array {
+  const offsets = [0];
+  for (let pos = data.indexOf(10); pos !== -1; pos = data.indexOf(10, pos + 1)) {
+    offsets.push(pos + 1);
+  }
+  if (offsets[offsets.length - 1] !== data.length) {
+    offsets.push(data.length);
+  }
+  return Uint32Array.from(offsets);
+}
+
+// Run graph-building writes in a transaction. If it rolls back, the
+// builder's cached node ids may point at rows that no longer exist.
+function transactGraph(db: IndexDatabase, graphBuilder: GraphBuilder, fn: () => void): void {
+  try {
+    db.transaction(fn);
+  } catch (error) {
+    graphBuilder.clearCache();
+    throw error;
+  }
+}
+
+// Files written per transaction during a reindex
+const WRITE_BATCH_SIZE = 500;
+
+// Files parsed at once during a reindex; parsing is mostly spent waiting
+// on the Ruby subprocess, so this tracks the cores available to it
+const INDEX_CONCURRENCY = Math.max(1, os.cpus().length);
+
+async function forEachConcurrent<T>(
+  items: T[],
+  limit: number,
+  fn: (item: T) => Promise<void>
+): Promise<void> {
+  let next = 0;
+  const worker = async () => {
+    while (next < items.length) {
+      await fn(items[next++]);
+    }
+  };
+  await Promise.all(Array.from({ length: Math.min(limit, items.length) }, worker));
+}
 
 export interface SearchResult {
   file_path: string;
@@ -34,20 +284,26 @@ export interface CallGraphResult {
 export class CodeIndexer {
   private repoPath: string;
   private db: IndexDatabase;
-  private regexParser: RubyParser;
+  private regexParser: RegexParserPool;
   private nativeParser: NativeRubyParser;
   private useNativeParser: boolean;
-  private railsPatterns: Map<string, RegExp>;
   private schemaParser: SchemaParser;
   private associationMapper: RailsAssociationMapper;
   private graphBuilder: GraphBuilder;
+  // Size, mtime and content hash per file seen by this process, so files
+  // that have not been touched are not read and hashed again
+  private fileStats = new Map<string, { size: number; mtimeMs: number; hash: string }>();
+  private lineIndex = new LruCache<string, LineIndex>(LINE_INDEX_CACHE_SIZE);
+  // Keyed by path, size, mtime and the request, so an edited file never
+  // hits; the watcher also evicts changed paths eagerly
+  private snippets = new LruCache<string, any>(SNIPPET_CACHE_SIZE);
 
   constructor(repoPath: string, db: IndexDatabase, rubyParserPath: string) {
     this.repoPath = path.resolve(repoPath);
     this.db = db;
     
     // Initialize both parsers
-    this.regexParser = new RubyParser(rubyParserPath);
+    this.regexParser = new RegexParserPool();
     this.nativeParser = new NativeRubyParser();
     
     // Initialize schema parser and association mapper
@@ -65,68 +321,104 @@ export class CodeIndexer {
     } else {
       console.log('[CodeIndexer] Using regex-based parser (Ruby not available)');
     }
-
-    // Rails-specific patterns
-    this.railsPatterns = new Map([
-      ['model', /app\/models\/.*\.rb$/],
-      ['controller', /app\/controllers\/.*\.rb$/],
-      ['service', /app\/services\/.*\.rb$/],
-      ['job', /(app\/jobs\/|app\/sidekiq\/).*\.rb$/],
-      ['policy', /app\/policies\/.*\.rb$/],
-      ['mailer', /app\/mailers\/.*\.rb$/],
-      ['helper', /app\/helpers\/.*\.rb$/],
-      ['concern', /app\/(controllers|models)\/concerns\/.*\.rb$/],
-      ['spec', /(spec|test)\/.*_(spec|test)\.rb$/],
-      ['migration', /db\/migrate\/.*\.rb$/]
-    ]);
   }
 
-  async reindex(paths?: string[], full: boolean = false): Promise<any> {
+  async reindex(paths?: string[], full: boolean = false, fileTypes?: string[]): Promise<any> {
     const startTime = Date.now();
     let filesProcessed = 0;
     let filesIndexed = 0;
     let filesFailed = 0;
 
-    if (full) {
-      this.db.clearAll();
-    }
-
     // Store metadata about this indexing operation
     this.db.setMetadata('repo_path', this.repoPath);
     this.db.setMetadata('index_started_at', new Date().toISOString());
 
     // Find all Ruby files
-    const patterns = paths?.length ? 
-      paths.map(p => path.join(this.repoPath, p, '**/*.rb')) :
-      [path.join(this.repoPath, '**/*.rb')];
-
-    const files: string[] = [];
-    for (const pattern of patterns) {
-      const matches = await glob(pattern, { 
-        ignore: ['**/node_modules/**', '**/vendor/**', '**/.git/**', '**/.rails-index/**']
-      });
-      files.push(...matches);
+    const roots = paths?.length ?
+      paths.map(p => path.join(this.repoPath, p)) :
+      [this.repoPath];
+
+    // Overlapping roots such as app and app/models find the same files;
+    // each is parsed once
+    const found = new Set<string>();
+    for (const root of roots) {
+      for (const filePath of await findRubyFiles(root, this.repoPath)) {
+        found.add(filePath);
+      }
+    }
+    let files = [...found];
+
+    // File type comes from the path alone, so excluded files are dropped
+    // before anything reads or parses them
+    const selective = !!fileTypes?.length;
+    if (selective) {
+      const wanted = new Set(fileTypes);
+      files = files.filter(filePath => wanted.has(this.detectFileType(path.relative(this.repoPath, filePath))));
     }
 
     filesProcessed = files.length;
 
     // Process each file
-    for (const filePath of files) {
+    const indexFiles = async (db: IndexDatabase, graphBuilder: GraphBuilder) => {
+      // Parses overlap; their writes are queued and flushed synchronously,
+      // WRITE_BATCH_SIZE files per transaction with a savepoint per file so
+      // one bad file does not roll back the rest of its batch
+      let batch: Array<{ filePath: string; write: () => void }> = [];
+      const flush = () => {
+        const writes = batch;
+        batch = [];
+        transactGraph(db, graphBuilder, () => {
+          for (const { filePath, write } of writes) {
+            try {
+              transactGraph(db, graphBuilder, write);
+              filesIndexed++;
+            } catch (error) {
+              console.error(`Failed to index ${filePath}:`, error);
+              filesFailed++;
+            }
+          }
+        });
+      };
+
+      await forEachConcurrent(files, INDEX_CONCURRENCY, async filePath => {
+        try {
+          const write = await this.parseForIndex(filePath, db, graphBuilder);
+          if (!write) {
+            filesIndexed++;
+            return;
+          }
+          batch.push({ filePath, write });
+          if (batch.length >= WRITE_BATCH_SIZE) {
+            flush();
+          }
+        } catch (error) {
+          console.error(`Failed to index ${filePath}:`, error);
+          filesFailed++;
+        }
+      });
+      if (batch.length > 0) {
+        flush();
+      }
+
+      // Index schema.rb if it exists
       try {
-        await this.indexFile(filePath);
-        filesIndexed++;
+        await this.indexSchema(db, graphBuilder);
       } catch (error) {
-        console.error(`Failed to index ${filePath}:`, error);
-        filesFailed++;
+        console.warn('[CodeIndexer] Failed to index schema.rb:', error);
+        // Don't fail the whole reindex if schema parsing fails
       }
-    }
+    };
 
-    // Index schema.rb if it exists
-    try {
-      await this.indexSchema();
-    } catch (error) {
-      console.warn('[CodeIndexer] Failed to index schema.rb:', error);
-      // Don't fail the whole reindex if schema parsing fails
+    // A full reindex is built in memory and swapped into the on-disk
+    // database by a single copy transaction
+    // A selective run updates its files in place: a staged rebuild would
+    // replace the index with only the selected files
+    if (full && !selective) {
+      await this.db.stagedLoad(staging => indexFiles(staging, new GraphBuilder(staging)));
+      // Node ids were replaced wholesale along with the graph tables
+      this.graphBuilder = new GraphBuilder(this.db);
+    } else {
+      await indexFiles(this.db, this.graphBuilder);
     }
 
     const duration = ((Date.now() - startTime) / 1000).toFixed(2);
@@ -135,7 +427,17 @@ export class CodeIndexer {
     this.db.setMetadata('last_indexed', new Date().toISOString());
     this.db.setMetadata('last_index_duration', duration);
     this.db.setMetadata('last_index_file_count', filesIndexed.toString());
-    
+    this.db.setMetadata('index_format_version', INDEX_FORMAT_VERSION);
+
+    // Once the whole tree has been seen, parses of content that is gone
+    // from it are dead weight
+    if (!paths?.length && !selective) {
+      this.db.pruneParseCache();
+    }
+
+    // Fold the write-ahead log accumulated by the bulk writes
+    this.db.checkpoint();
+
     // Get statistics
     const stats = this.db.getStats();
 
@@ -149,35 +451,68 @@ export class CodeIndexer {
     };
   }
 
-  private async indexFile(filePath: string): Promise<void> {
-    const stats = fs.statSync(filePath);
-    const content = fs.readFileSync(filePath, 'utf-8');
-    const hash = crypto.createHash('sha256').update(content).digest('hex');
+  private async indexFile(
+    filePath: string,
+    db: IndexDatabase = this.db,
+    graphBuilder: GraphBuilder = this.graphBuilder
+  ): Promise<void> {
+    const write = await this.parseForIndex(filePath, db, graphBuilder);
+    if (write) {
+      transactGraph(db, graphBuilder, write);
+    }
+  }
+
+  /**
+   * Parse a file if its content changed since it was last indexed. Returns
+   * the writes that store it, for the caller to run inside a transaction,
+   * or null when there is nothing to do.
+   */
+  private async parseForIndex(
+    filePath: string,
+    db: IndexDatabase,
+    graphBuilder: GraphBuilder
+  ): Promise<(() => void) | null> {
+    const stats = await fs.promises.stat(filePath);
+    const known = this.fileStats.get(filePath);
+    let hash: string;
+    let data: Buffer | undefined;
+    if (known && known.size === stats.size && known.mtimeMs === stats.mtimeMs) {
+      hash = known.hash;
+    } else {
+      // Hash the raw bytes; the text is only decoded if it gets parsed
+      data = await fs.promises.readFile(filePath);
+      hash = crypto.createHash('sha256').update(data).digest('hex');
+      this.fileStats.set(filePath, { size: stats.size, mtimeMs: stats.mtimeMs, hash });
+    }
     
     // Check if file needs reindexing
     const relativePath = path.relative(this.repoPath, filePath);
-    const existingFile = this.db.getFileByPath(relativePath);
-    
-    // Skip if file unchanged (same hash and not forced native parser reparse)
-    if (existingFile && existingFile.hash === hash && !this.useNativeParser) {
-      return; // File unchanged and using regex parser
-    }
+    const existingFile = db.getFileByPath(relativePath);
     
-    // Also skip if file hasn't been modified since last index
-    if (existingFile && existingFile.last_indexed) {
-      const lastIndexedTime = new Date(existingFile.last_indexed).getTime();
-      const fileModifiedTime = stats.mtime.getTime();
-      if (fileModifiedTime < lastIndexedTime && existingFile.hash === hash) {
-        return; // File not modified since last index
-      }
+    // Skip if the content is unchanged since the last index
+    if (existingFile && existingFile.hash === hash) {
+      return null;
     }
 
+    // Line offsets are stored with the file so snippets can seek straight
+    // to their lines without rescanning it
+    data ??= await fs.promises.readFile(filePath);
+    const offsets = lineOffsets(data);
+
     let parseResult: RubyParseResult | NativeParseResult;
     
-    // Try native parser first if available
-    if (this.useNativeParser) {
+    // Try native parser first if available, reusing a cached result for
+    // the same content. Lookups go to the main database; new results are
+    // stored with the file's other rows, and a staged full reindex carries
+    // them over in its swap.
+    const cached = this.useNativeParser ? this.db.getCachedParse(hash) : undefined;
+    let parseToCache: string | undefined;
+    if (cached) {
+      parseResult = JSON.parse(cached);
+    } else if (this.useNativeParser) {
       try {
-        parseResult = await this.nativeParser.parseFile(filePath);
+        parseResult = await this.nativeParser.parseFile(filePath, data?.toString('utf-8'));
+        parseToCache = JSON.stringify(parseResult);
       } catch (error) {
         console.warn(`Native parse failed for ${filePath}, falling back to regex:`, error);
         parseResult = await this.regexParser.parseFile(filePath);
@@ -187,21 +522,35 @@ export class CodeIndexer {
     }
 
     // Convert native result to common format if needed
-    const fileType = this.detectFileType(filePath);
-
-    // Store in database
-    const fileId = this.db.upsertFile({
-      path: relativePath,
-      hash,
-      file_type: fileType,
-      line_count: parseResult.line_count || 0,
-      last_indexed: new Date().toISOString()
-    });
+    const fileType = this.detectFileType(relativePath);
+
+    // Everything stored for this file, run by the caller as one unit
+    return () => {
+      // Deleting the old files row cascades to its symbols and their calls.
+      // Unconditional: the row may have been written since the check above,
+      // by an overlapping parse of the same file.
+      db.deleteFile(relativePath);
+      if (parseToCache) {
+        db.cacheParse(hash, parseToCache);
+      }
 
-    // Index symbols
-    if (parseResult.symbols) {
-      for (const symbol of parseResult.symbols) {
-        this.db.insertSymbol({
+      const fileId = db.upsertFile({
+        path: relativePath,
+        hash,
+        file_type: fileType,
+        line_count: parseResult.line_count || 0,
+        last_indexed: new Date().toISOString(),
+        line_offsets: Buffer.from(offsets.buffer, offsets.byteOffset, offsets.byteLength),
+        // Taken before the read, so an edit racing it leaves them stale
+        // rather than matching content they do not describe
+        size: stats.size,
+        mtime_ms: stats.mtimeMs
+      });
+
+      // Symbols and Rails associations go in as one batch
+      const rows: Omit<SymbolRecord, 'id'>[] = [];
+      for (const symbol of parseResult.symbols || []) {
+        rows.push({
           file_id: fileId,
           name: symbol.name,
           type: symbol.type,
@@ -210,17 +559,11 @@ export class CodeIndexer {
           end_line: symbol.end_line,
           signature: 'signature' in symbol ? symbol.signature : null,
           visibility: symbol.visibility || 'public',
-          documentation: 'documentation' in symbol ? symbol.documentation : null,
-          references: JSON.stringify(symbol.references || []),
-          metadata: JSON.stringify(symbol.metadata || [])
+          documentation: 'documentation' in symbol ? symbol.documentation : null
         });
       }
-    }
-
-    // Index Rails-specific metadata
-    if (parseResult.associations) {
-      for (const assoc of parseResult.associations) {
-        this.db.insertSymbol({
+      for (const assoc of parseResult.associations || []) {
+        rows.push({
           file_id: fileId,
           name: assoc.name,
           type: 'association',
@@ -229,31 +572,35 @@ export class CodeIndexer {
           end_line: 0,
           signature: null,
           visibility: 'public',
-          documentation: null,
-          references: JSON.stringify([]),
-          metadata: JSON.stringify(assoc)
+          documentation: null
         });
       }
-    }
+      db.insertSymbols(rows);
 
-    // Build knowledge graph
-    const enrichedResult = {
-      ...parseResult,
-      file_type: fileType
+      // Build knowledge graph
+      const enrichedResult = {
+        ...parseResult,
+        file_type: fileType
+      };
+      graphBuilder.buildFromAST(relativePath, enrichedResult, fileId);
     };
-    await this.graphBuilder.buildFromAST(relativePath, enrichedResult, fileId);
   }
 
   private detectFileType(filePath: string): string {
-    for (const [type, pattern] of this.railsPatterns) {
-      if (pattern.test(filePath)) {
+    for (const [dir, suffix, type] of RAILS_FILE_RULES) {
+      // The directory may also sit below the root, e.g. inside an engine
+      if (filePath.endsWith(suffix) &&
+          (filePath.startsWith(dir) || filePath.includes(`/${dir}`))) {
         return type;
       }
     }
     return 'ruby';
   }
 
-  private async indexSchema(): Promise<void> {
+  private async indexSchema(
+    db: IndexDatabase = this.db,
+    graphBuilder: GraphBuilder = this.graphBuilder
+  ): Promise<void> {
     const schemaPath = path.join(this.repoPath, 'db', 'schema.rb');
     
     if (!fs.existsSync(schemaPath)) {
@@ -266,42 +613,47 @@ export class CodeIndexer {
     // Parse the schema file
     const schemaData = await this.schemaParser.parseFile(schemaPath);
     
-    // Clear existing schema data
-    this.db.clearSchema();
-    
-    // Store tables and their metadata
-    for (const table of schemaData.tables) {
-      const tableId = this.db.upsertSchemaTable(table.name, table.primary_key);
+    // Replace the stored schema and its graph in one transaction, rather
+    // than committing every column, index and node on its own
+    transactGraph(db, graphBuilder, () => {
+      // Clear existing schema data
+      db.clearSchema();
       
-      // Store columns
-      for (const column of table.columns) {
-        this.db.insertSchemaColumn(tableId, column);
+      // Store tables and their metadata
+      for (const table of schemaData.tables) {
+        const tableId = db.upsertSchemaTable(table.name, table.primary_key);
+        
+        // Store columns
+        for (const column of table.columns) {
+          db.insertSchemaColumn(tableId, column);
+        }
+        
+        // Store indexes
+        for (const index of table.indexes) {
+          db.insertSchemaIndex(tableId, index);
+        }
       }
       
-      // Store indexes
-      for (const index of table.indexes) {
-        this.db.insertSchemaIndex(tableId, index);
+      // Store foreign keys
+      for (const fk of schemaData.foreign_keys) {
+        db.insertSchemaForeignKey(fk);
       }
-    }
-    
-    // Store foreign keys
-    for (const fk of schemaData.foreign_keys) {
-      this.db.insertSchemaForeignKey(fk);
-    }
-    
-    // Store schema version as metadata
-    if (schemaData.version) {
-      this.db.setMetadata('schema_version', schemaData.version);
-    }
-    
-    // Build graph from schema
-    await this.graphBuilder.buildFromSchema(schemaData.tables);
+      
+      // Store schema version as metadata
+      if (schemaData.version) {
+        db.setMetadata('schema_version', schemaData.version);
+      }
+      
+      // Build graph from schema
+      graphBuilder.buildFromSchema(schemaData.tables);
+    });
     
     console.log(`[CodeIndexer] Indexed ${schemaData.tables.length} tables from schema.rb`);
   }
 
   async searchSymbols(query: string, limit: number = 10, fileTypes?: string[]): Promise<SearchResult[]> {
-    return this.db.searchSymbols(query, limit, fileTypes);
+    const match = symbolMatchQuery(query);
+    return match ? this.db.searchSymbols(match, limit, fileTypes) : [];
   }
 
   async getSnippet(
@@ -314,34 +666,105 @@ export class CodeIndexer {
       filePath : 
       path.join(this.repoPath, filePath);
 
-    if (!fs.existsSync(absolutePath)) {
-      throw new Error(`File not found: ${filePath}`);
+    // Open up front rather than checking existence first: a missing file
+    // fails the open itself, and one fstat of the open file then serves
+    // both the result cache and the line offsets
+    let handle: fs.promises.FileHandle;
+    try {
+      handle = await fs.promises.open(absolutePath, 'r');
+    } catch (error: any) {
+      if (error.code === 'ENOENT') {
+        throw new Error(`File not found: ${filePath}`);
+      }
+      throw error;
     }
 
-    const content = fs.readFileSync(absolutePath, 'utf-8');
-    const lines = content.split('\n');
+    try {
+      const stats = await handle.stat();
 
-    if (symbolName) {
-      // Find symbol in database
-      const symbols = this.db.searchSymbols(symbolName, 1, undefined);
-      if (symbols.length > 0) {
-        startLine = symbols[0].start_line;
-        endLine = symbols[0].end_line;
+      // A symbol may resolve to a hit in another file, so those results
+      // also depend on the state of the index
+      const cacheKey = [
+        absolutePath, stats.size, stats.mtimeMs, startLine, endLine, symbolName,
+        symbolName ? this.db.dataVersion() : ''
+      ].join('\0');
+      const cached = this.snippets.get(cacheKey);
+      if (cached) {
+        return cached;
       }
-    }
 
-    const start = (startLine || 1) - 1;
-    const end = endLine || lines.length;
-    
-    const snippet = lines.slice(start, end).join('\n');
+      if (symbolName) {
+        // Prefer the symbol defined in this file, then fall back to the best
+        // full-text hit anywhere in the index
+        const relativePath = path.relative(this.repoPath, absolutePath);
+        let location = this.db.findSymbolLines(relativePath, symbolName);
+        const match = location ? null : symbolMatchQuery(symbolName);
+        if (match) {
+          for (const hit of this.db.iterateSymbols(match, 1)) {
+            location = hit;
+            break;
+          }
+        }
+        if (location) {
+          startLine = location.start_line;
+          endLine = location.end_line;
+        }
+      }
 
-    return {
-      file_path: filePath,
-      start_line: startLine || 1,
-      end_line: end,
-      snippet,
-      language: 'ruby'
-    };
+      // Lines are whole and start at 1, whatever the request says. Without
+      // an explicit end the snippet is capped.
+      const first = Math.max(1, Math.floor(startLine || 1));
+      const wanted = endLine ? Math.max(1, Math.floor(endLine)) : first + MAX_SNIPPET_LINES - 1;
+
+      // Line offsets are kept per file, so a snippet is one positional
+      // read of exactly its byte range. They come from the index when the
+      // file is unchanged since it was indexed, else from one full read.
+      let index = this.lineIndex.get(absolutePath);
+      let data: Buffer | undefined;
+      if (!index || index.size !== stats.size || index.mtimeMs !== stats.mtimeMs) {
+        const stored = this.db.getLineOffsets(path.relative(this.repoPath, absolutePath));
+        let offsets: Uint32Array | undefined;
+        if (stored && stored.size === stats.size && stored.mtime_ms === stats.mtimeMs) {
+          // Copy out of the blob, whose bytes need not be 4-byte aligned
+          const bytes = new Uint8Array(stored.line_offsets);
+          offsets = new Uint32Array(bytes.buffer, 0, bytes.byteLength >>> 2);
+        }
+        if (!offsets) {
+          data = await handle.readFile();
+          offsets = lineOffsets(data);
+        }
+        index = { size: stats.size, mtimeMs: stats.mtimeMs, offsets };
+        this.lineIndex.set(absolutePath, index);
+      }
+
+      const { offsets } = index;
+      const last = Math.min(wanted, offsets.length - 1);
+      let snippet = '';
+      if (last >= first) {
+        const from = offsets[first - 1];
+        const to = offsets[last];
+        let bytes: Buffer;
+        if (data) {
+          bytes = data.subarray(from, to);
+        } else {
+          bytes = Buffer.allocUnsafe(to - from);
+          await handle.read(bytes, 0, bytes.length, from);
+        }
+        snippet = bytes.toString('utf-8').replace(/\r?\n$/, '').replace(/\r\n/g, '\n');
+      }
+
+      const result = {
+        file_path: filePath,
+        start_line: first,
+        end_line: Math.max(last, first - 1),
+        snippet,
+        language: 'ruby'
+      };
+      this.snippets.set(cacheKey, result);
+      return result;
+    } finally {
+      await handle.close();
+    }
   }
 
   async callGraph(symbol: string, direction: 'callers' | 'callees' | 'both', depth: number): Promise<CallGraphResult> {
@@ -355,31 +778,138 @@ export class CodeIndexer {
     };
   }
 
-  async findSimilar(codeSnippet: string, k: number, minSimilarity: number): Promise<any[]> {
-    // Basic implementation - search for similar patterns
-    const tokens = codeSnippet.split(/\s+/).filter(t => t.length > 2);
-    const query = tokens.join(' ');
-    
-    const results = await this.searchSymbols(query, k);
-    return results.filter(r => (r.score || 0) >= minSimilarity);
+  async findSimilar(codeSnippet: string, k: number, minSimilarity: number): Promise<SearchResult[]> {
+    // Built once and shared by every candidate comparison
+    const queryTokens = new Set(tokensOf([codeSnippet]));
+    if (queryTokens.size === 0) return [];
+
+    // Full-text search narrows the index to symbols sharing any token;
+    // the actual ranking is Jaccard similarity over their source
+    const query = [...queryTokens].map(token => `"${token}"`).join(' OR ');
+    const candidates = [...this.db.iterateSymbols(query, k * SIMILAR_CANDIDATE_FACTOR)]
+      .filter(symbol => symbol.start_line > 0);
+
+    // Read each candidate file once
+    const sources = new Map<string, string[] | null>();
+    for (const symbol of candidates) {
+      if (!sources.has(symbol.file_path)) {
+        try {
+          const content = await fs.promises.readFile(path.join(this.repoPath, symbol.file_path), 'utf-8');
+          sources.set(symbol.file_path, content.split('\n'));
+        } catch {
+          sources.set(symbol.file_path, null);
+        }
+      }
+    }
+
+    const scored = candidates.filter(symbol => sources.get(symbol.file_path));
+    const scores = jaccardScores(queryTokens, scored.map(symbol => {
+      const lines = sources.get(symbol.file_path)!;
+      return tokensOf(lines.slice(symbol.start_line - 1, symbol.end_line));
+    }));
+
+    return scored
+      .map((symbol, i): SearchResult => ({
+        file_path: symbol.file_path,
+        symbol_name: symbol.name,
+        symbol_type: symbol.type,
+        start_line: symbol.start_line,
+        end_line: symbol.end_line,
+        score: scores[i]
+      }))
+      .filter(result => result.score! >= minSimilarity)
+      .sort((a, b) => b.score! - a.score!)
+      .slice(0, k);
   }
 
+
   async findTests(filePath: string): Promise<string[]> {
     const basename = path.basename(filePath, '.rb');
+
+    // Answer from the index when there is one
+    if (this.db.hasFiles()) {
+      const name = basename.replace(/[.*+?^${}()|[\]\\]/g, '\\$&');
+      return this.db.findFilesByPattern(
+        `^(spec/(.*/)?[^/]*${name}_spec|test/(.*/)?[^/]*${name}_test)\\.rb$`
+      );
+    }
+
     const testPatterns = [
       `spec/**/*${basename}_spec.rb`,
-      `test/**/*${basename}_test.rb`,
-      `spec/**/${basename}_spec.rb`,
-      `test/**/${basename}_test.rb`
+      `test/**/*${basename}_test.rb`
     ];
 
-    const testFiles: string[] = [];
-    for (const pattern of testPatterns) {
-      const matches = await glob(path.join(this.repoPath, pattern));
-      testFiles.push(...matches.map(f => path.relative(this.repoPath, f)));
+    // Same directory pruning as the indexer's walk, checked by component
+    // name so the excluded trees are never read
+    const matches = await glob(testPatterns, {
+      cwd: this.repoPath,
+      ignore: { childrenIgnored: dir => EXCLUDED_DIRS.has(dir.name) }
+    });
+
+    return [...new Set(matches)];
+  }
+
+  /**
+   * Apply changes reported for paths relative to the repo root: files
+   * that still exist are re-parsed if their content changed, vanished
+   * ones are dropped from the index. A directory stands for everything
+   * under it, so one that was created, moved or deleted is rescanned.
+   */
+  async updateFiles(relativePaths: string[]): Promise<{ updated: number; removed: number }> {
+    let updated = 0;
+    let removed = 0;
+
+    const files = new Set<string>();
+    for (const relativePath of relativePaths) {
+      if (relativePath.endsWith('.rb')) {
+        files.add(relativePath);
+        continue;
+      }
+      // What the index holds beneath it, which may be gone, and what is
+      // there now; a path that is not a directory yields neither
+      for (const indexed of this.db.findFilesUnder(relativePath)) {
+        files.add(indexed);
+      }
+      for (const filePath of await findRubyFiles(path.join(this.repoPath, relativePath), this.repoPath)) {
+        files.add(path.relative(this.repoPath, filePath));
+      }
     }
+    const changedFiles = [...files].filter(isIndexedPath);
 
-    return testFiles;
+    // Drop cached snippets and line offsets for the changed files; snippet
+    // keys start with the absolute path
+    const changed = new Set(changedFiles.map(relativePath => path.join(this.repoPath, relativePath)));
+    this.snippets.deleteWhere(key => changed.has(key.slice(0, key.indexOf('\0'))));
+    this.lineIndex.deleteWhere(key => changed.has(key));
+
+    await forEachConcurrent(changedFiles, INDEX_CONCURRENCY, async (relativePath) => {
+      const filePath = path.join(this.repoPath, relativePath);
+      try {
+        await this.indexFile(filePath);
+        updated++;
+      } catch (error: any) {
+        if (error.code !== 'ENOENT') {
+          console.error(`Failed to update ${relativePath}:`, error);
+          return;
+        }
+        this.fileStats.delete(filePath);
+        this.db.removeFile(relativePath);
+        // Cached node ids may belong to the nodes just removed
+        this.graphBuilder.clearCache();
+        removed++;
+      }
+    });
+
+    return { updated, removed };
+  }
+
+  /**
+   * Shut down the parser workers. The Ruby processes see their input close
+   * and exit once they have answered what was already sent.
+   */
+  close(): void {
+    this.nativeParser.close();
+    this.regexParser.close();
   }
 
   async incrementalReindex(): Promise<any> {
@@ -389,17 +919,14 @@ export class CodeIndexer {
     let filesFailed = 0;
 
     // Find all Ruby files
-    const pattern = path.join(this.repoPath, '**/*.rb');
-    const files = await glob(pattern, { 
-      ignore: ['**/node_modules/**', '**/vendor/**', '**/.git/**', '**/.rails-index/**']
-    });
+    const files = await findRubyFiles(this.repoPath, this.repoPath);
 
     filesChecked = files.length;
 
     // Check each file for changes
     for (const filePath of files) {
       try {
-        const stats = fs.statSync(filePath);
+        const stats = await fs.promises.stat(filePath);
         const relativePath = path.relative(this.repoPath, filePath);
         const existingFile = this.db.getFileByPath(relativePath);
         
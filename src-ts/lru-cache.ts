@@ -0,0 +1,67 @@
+/**
+ * Small bounded LRU cache built on Map insertion order
+ */
+
+export class LruCache<K, V> {
+  private entries = new Map<K, V>();
+  private maxSize: number;
+
+  constructor(maxSize: number) {
+    this.maxSize = maxSize;
+  }
+
+  get size(): number {
+    return this.entries.size;
+  }
+
+  has(key: K): boolean {
+    return this.entries.has(key);
+  }
+
+  /**
+   * Return the cached value and mark it most recently used
+   */
+  get(key: K): V | undefined {
+    if (!this.entries.has(key)) {
+      return undefined;
+    }
+    const value = this.entries.get(key)!;
+    this.entries.delete(key);
+    this.entries.set(key, value);
+    return value;
+  }
+
+  /**
+   * Insert or refresh a value, evicting the least recently used entry
+   * when the cache is full
+   */
+  set(key: K, value: V): void {
+    this.entries.delete(key);
+    if (this.entries.size >= this.maxSize) {
+      this.entries.delete(this.entries.keys().next().value!);
+    }
+    this.entries.set(key, value);
+  }
+
+  delete(key: K): boolean {
+    return this.entries.delete(key);
+  }
+
+  /**
+   * Drop every entry whose key matches, returning how many went
+   */
+  deleteWhere(predicate: (key: K) => boolean): number {
+    let deleted = 0;
+    for (const key of [...this.entries.keys()]) {
+      if (predicate(key)) {
+        this.entries.delete(key);
+        deleted++;
+      }
+    }
+    return deleted;
+  }
+
+  clear(): void {
+    this.entries.clear();
+  }
+}
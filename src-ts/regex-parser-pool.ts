@@ -0,0 +1,91 @@
+/**
+ * Worker-thread pool for the regex Ruby parser
+ * Keeps the CPU-bound line scanning off the main thread, and spreads it
+ * across cores, when the native parser is not available
+ */
+
+import { Worker, isMainThread, parentPort } from 'node:worker_threads';
+import { RubyParser, RubyParseResult } from './ruby-parser.js';
+import { WorkerPool, poolSize } from './worker-pool.js';
+
+// One worker per core unless PARSER_WORKERS says otherwise
+const REGEX_POOL_SIZE = poolSize();
+
+interface ParseRequest {
+  id: number;
+  filePath: string;
+}
+
+interface PendingParse {
+  resolve: (result: RubyParseResult) => void;
+  reject: (error: Error) => void;
+}
+
+// Worker side: this module is also the worker's entry point
+if (!isMainThread && parentPort) {
+  const port = parentPort;
+  const parser = new RubyParser();
+  port.on('message', async ({ id, filePath }: ParseRequest) => {
+    // parseFile reports failures in the result rather than throwing
+    port.postMessage({ id, result: await parser.parseFile(filePath) });
+  });
+}
+
+class RegexWorker {
+  private worker: Worker;
+  private pending = new Map<number, PendingParse>();
+  public alive = true;
+
+  constructor() {
+    this.worker = new Worker(new URL(import.meta.url));
+    this.worker.on('message', ({ id, result }: { id: number; result: RubyParseResult }) => {
+      const request = this.pending.get(id);
+      if (!request) return;
+      this.pending.delete(id);
+      if (this.pending.size === 0) {
+        this.worker.unref();
+      }
+      request.resolve(result);
+    });
+    this.worker.on('error', (err) => this.fail(err));
+    this.worker.on('exit', (code) => this.fail(new Error(`Regex parser worker exited with code ${code}`)));
+    this.worker.unref();
+  }
+
+  get load(): number {
+    return this.pending.size;
+  }
+
+  request(id: number, filePath: string): Promise<RubyParseResult> {
+    return new Promise((resolve, reject) => {
+      this.pending.set(id, { resolve, reject });
+      this.worker.ref();
+      this.worker.postMessage({ id, filePath });
+    });
+  }
+
+  close(): void {
+    this.alive = false;
+    this.worker.terminate();
+  }
+
+  private fail(error: Error): void {
+    this.alive = false;
+    for (const request of this.pending.values()) {
+      request.reject(error);
+    }
+    this.pending.clear();
+  }
+}
+
+export class RegexParserPool extends WorkerPool<RegexWorker> {
+  private nextId = 1;
+
+  constructor(size: number = REGEX_POOL_SIZE) {
+    super(size, () => new RegexWorker());
+  }
+
+  parseFile(filePath: string): Promise<RubyParseResult> {
+    return this.acquire().request(this.nextId++, filePath);
+  }
+}
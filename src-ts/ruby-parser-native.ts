@@ -3,10 +3,12 @@
  * Uses actual Ruby parser gem or Prism for accurate AST parsing
  */
 
-import { spawn, execSync } from 'node:child_process';
+import { spawn, execSync, ChildProcess } from 'node:child_process';
 import { fileURLToPath } from 'node:url';
 import { dirname, join } from 'node:path';
 import { existsSync } from 'node:fs';
+import { Socket } from 'node:net';
+import { WorkerPool, poolSize } from './worker-pool.js';
 
 const __filename = fileURLToPath(import.meta.url);
 const __dirname = dirname(__filename);
@@ -63,9 +65,145 @@ export interface NativeParseResult {
   scopes: string[];
 }
 
+// Persistent Ruby processes kept for parsing; each one pays interpreter
+// and parser gem startup once instead of once per file. PARSER_WORKERS
+// overrides the default of one per core, capped at 8.
+const RUBY_POOL_SIZE = poolSize(8);
+
+interface PendingParse {
+  resolve: (result: NativeParseResult) => void;
+  reject: (error: Error) => void;
+}
+
+/**
+ * One `ruby_ast_cli.rb --server` process. Requests and responses are
+ * newline-delimited JSON matched up by id, so several can be in flight.
+ */
+class RubyWorker {
+  private process: ChildProcess;
+  private pending = new Map<number, PendingParse>();
+  // Pieces of a response line still waiting for its newline
+  private partial: string[] = [];
+  public alive = true;
+
+  constructor() {
+    this.process = spawn('ruby', [RUBY_CLI, '--server'], {
+      stdio: ['pipe', 'pipe', 'inherit'],
+      env: {
+        ...process.env,
+        RUBY_AST_BACKEND: process.env.RUBY_AST_BACKEND || 'parser'
+      }
+    });
+
+    this.process.stdout!.setEncoding('utf8');
+    this.process.stdout!.on('data', (chunk: string) => this.receive(chunk));
+    this.process.on('error', (err) => this.fail(new Error(`Failed to spawn Ruby process: ${err.message}`)));
+    this.process.on('exit', (code, signal) => this.fail(new Error(`Ruby worker exited (${signal || `code ${code}`})`)));
+    // Writing to a worker that died raises EPIPE on stdin; unhandled, that
+    // stream error would take the whole server down
+    this.process.stdin!.on('error', (err) => {
+      this.fail(new Error(`Ruby worker input failed: ${err.message}`));
+      this.process.kill();
+    });
+    this.setIdle(true);
+  }
+
+  get load(): number {
+    return this.pending.size;
+  }
+
+  request(id: number, filePath: string, source?: string): Promise<NativeParseResult> {
+    return new Promise((resolve, reject) => {
+      this.pending.set(id, { resolve, reject });
+      this.setIdle(false);
+      this.process.stdin!.write(JSON.stringify({ id, path: filePath, source }) + '\n');
+    });
+  }
+
+  close(): void {
+    this.alive = false;
+    this.process.stdin!.end();
+  }
+
+  // Only the new chunk is scanned for newlines, and a large response is
+  // joined once when it completes rather than re-copied on every chunk
+  private receive(chunk: string): void {
+    let start = 0;
+    let newline: number;
+    while ((newline = chunk.indexOf('\n', start)) !== -1) {
+      this.partial.push(chunk.slice(start, newline));
+      const line = this.partial.join('');
+      this.partial = [];
+      if (line) {
+        this.dispatch(line);
+      }
+      start = newline + 1;
+    }
+    if (start < chunk.length) {
+      this.partial.push(chunk.slice(start));
+    }
+  }
+
+  private dispatch(line: string): void {
+    let response: { id: number; result?: NativeParseResult; error?: string };
+    try {
+      response = JSON.parse(line);
+    } catch (e) {
+      console.warn(`[NativeRubyParser] Discarding malformed worker output: ${e}`);
+      return;
+    }
+
+    const request = this.pending.get(response.id);
+    if (!request) return;
+    this.pending.delete(response.id);
+    if (this.pending.size === 0) {
+      this.setIdle(true);
+    }
+
+    if (response.error !== undefined) {
+      request.reject(new Error(`Ruby parser failed: ${response.error}`));
+    } else {
+      request.resolve(response.result!);
+    }
+  }
+
+  private fail(error: Error): void {
+    this.alive = false;
+    for (const request of this.pending.values()) {
+      request.reject(error);
+    }
+    this.pending.clear();
+  }
+
+  // An idle worker must not keep the Node process alive on its own
+  private setIdle(idle: boolean): void {
+    const handles = [this.process, this.process.stdin, this.process.stdout] as Array<ChildProcess | Socket>;
+    for (const handle of handles) {
+      if (idle) {
+        handle.unref();
+      } else {
+        handle.ref();
+      }
+    }
+  }
+}
+
+export class RubyWorkerPool extends WorkerPool<RubyWorker> {
+  private nextId = 1;
+
+  constructor(size: number = RUBY_POOL_SIZE) {
+    super(size, () => new RubyWorker());
+  }
+
+  parseFile(filePath: string, source?: string): Promise<NativeParseResult> {
+    return this.acquire().request(this.nextId++, filePath, source);
+  }
+}
+
 export class NativeRubyParser {
   private rubyAvailable: boolean = false;
   private rubyVersion: string | null = null;
+  private pool = new RubyWorkerPool();
   
   constructor() {
     this.checkRubyAvailability();
@@ -98,48 +236,20 @@ export class NativeRubyParser {
     return this.rubyVersion;
   }
   
-  public async parseFile(filePath: string): Promise<NativeParseResult> {
+  /**
+   * Parse a file. When the caller already holds its content, pass it as
+   * source so the worker does not read the file again.
+   */
+  public async parseFile(filePath: string, source?: string): Promise<NativeParseResult> {
     if (!this.rubyAvailable) {
       throw new Error('Ruby runtime not available');
     }
-    
-    return new Promise((resolve, reject) => {
-      const rubyProcess = spawn('ruby', [RUBY_CLI, filePath], {
-        stdio: ['ignore', 'pipe', 'pipe'],
-        env: {
-          ...process.env,
-          RUBY_AST_BACKEND: process.env.RUBY_AST_BACKEND || 'parser'
-        }
-      });
-      
-      let stdout = '';
-      let stderr = '';
-      
-      rubyProcess.stdout.on('data', (data) => {
-        stdout += data.toString();
-      });
-      
-      rubyProcess.stderr.on('data', (data) => {
-        stderr += data.toString();
-      });
-      
-      rubyProcess.on('close', (code) => {
-        if (code === 0) {
-          try {
-            const result = JSON.parse(stdout);
-            resolve(result);
-          } catch (e) {
-            reject(new Error(`Failed to parse Ruby output: ${e}`));
-          }
-        } else {
-          reject(new Error(`Ruby parser failed: ${stderr || `exit code ${code}`}`));
-        }
-      });
-      
-      rubyProcess.on('error', (err) => {
-        reject(new Error(`Failed to spawn Ruby process: ${err.message}`));
-      });
-    });
+
+    return this.pool.parseFile(filePath, source);
+  }
+
+  public close(): void {
+    this.pool.close();
   }
   
   public async parseFileWithFallback(
@@ -35,6 +35,25 @@ export interface RubyParseResult {
   error?: string;
 }
 
+// Line patterns, compiled once at load rather than per line
+const CLASS_RE = /^\s*class\s+(\w+)(?:\s*<\s*(\w+))?/;
+const MODULE_RE = /^\s*module\s+(\w+)/;
+const METHOD_RE = /^\s*def\s+(self\.)?(\w+[\w?!=]*)\s*(\([^)]*\))?/;
+const ASSOCIATION_RE = /^\s*(has_many|has_one|belongs_to|has_and_belongs_to_many)\s+:(\w+)/;
+const VALIDATION_RE = /^\s*validates?\s+:(\w+)/;
+const CALLBACK_RE = /^\s*(before_|after_|around_)(save|create|update|destroy|validation|commit|rollback)\s+:(\w+)/;
+const SCOPE_RE = /^\s*scope\s+:(\w+)/;
+const ATTR_RE = /^\s*(attr_reader|attr_writer|attr_accessor)\s+:(\w+)/;
+const INCLUDE_RE = /^\s*include\s+(\w+)/;
+const EXTEND_RE = /^\s*extend\s+(\w+)/;
+const REQUIRE_RE = /^\s*require\s+['"]([^'"]+)['"]/;
+const REQUIRE_RELATIVE_RE = /^\s*require_relative\s+['"]([^'"]+)['"]/;
+const PRIVATE_RE = /^\s*private\s*$/;
+const PROTECTED_RE = /^\s*protected\s*$/;
+const PUBLIC_RE = /^\s*public\s*$/;
+const END_RE = /^\s*end\s*$/;
+const BLOCK_OPEN_RE = /^\s*(class|module|def|if|unless|while|until|for|begin|case)\b/;
+
 export class RubyParser {
   private currentVisibility: string = 'public';
   private currentClass: string | null = null;
@@ -59,10 +78,6 @@ export class RubyParser {
    */
   async parseFile(filePath: string): Promise<RubyParseResult> {
     try {
-      if (!fs.existsSync(filePath)) {
-        return this.emptyResult(`File not found: ${filePath}`);
-      }
-
       const content = fs.readFileSync(filePath, 'utf-8');
       const lines = content.split('\n');
       
@@ -82,6 +97,9 @@ export class RubyParser {
       this.parseContent(lines, result);
       return result;
     } catch (error: any) {
+      if (error.code === 'ENOENT') {
+        return this.emptyResult(`File not found: ${filePath}`);
+      }
       return this.emptyResult(`Parse error: ${error.message}`);
     }
   }
@@ -99,7 +117,7 @@ export class RubyParser {
       if (trimmed.startsWith('#') || trimmed === '') continue;
 
       // Class definition
-      const classMatch = line.match(/^\s*class\s+(\w+)(?:\s*<\s*(\w+))?/);
+      const classMatch = CLASS_RE.exec(line);
       if (classMatch) {
         const className = classMatch[1];
         const superClass = classMatch[2] || null;
@@ -119,7 +137,7 @@ export class RubyParser {
       }
 
       // Module definition
-      const moduleMatch = line.match(/^\s*module\s+(\w+)/);
+      const moduleMatch = MODULE_RE.exec(line);
       if (moduleMatch) {
         const moduleName = moduleMatch[1];
         classStack.push(moduleName);
@@ -138,7 +156,7 @@ export class RubyParser {
       }
 
       // Method definition
-      const methodMatch = line.match(/^\s*def\s+(self\.)?(\w+[\w?!=]*)\s*(\([^)]*\))?/);
+      const methodMatch = METHOD_RE.exec(line);
       if (methodMatch) {
         const isClassMethod = !!methodMatch[1];
         const methodName = methodMatch[2];
@@ -159,7 +177,7 @@ export class RubyParser {
       }
 
       // Rails associations
-      const associationMatch = line.match(/^\s*(has_many|has_one|belongs_to|has_and_belongs_to_many)\s+:(\w+)/);
+      const associationMatch = ASSOCIATION_RE.exec(line);
       if (associationMatch) {
         result.associations.push({
           type: associationMatch[1],
@@ -169,14 +187,14 @@ export class RubyParser {
       }
 
       // Rails validations
-      const validationMatch = line.match(/^\s*validates?\s+:(\w+)/);
+      const validationMatch = VALIDATION_RE.exec(line);
       if (validationMatch) {
         result.validations.push(validationMatch[1]);
         continue;
       }
 
       // Rails callbacks
-      const callbackMatch = line.match(/^\s*(before_|after_|around_)(save|create|update|destroy|validation|commit|rollback)\s+:(\w+)/);
+      const callbackMatch = CALLBACK_RE.exec(line);
       if (callbackMatch) {
         result.callbacks.push({
           type: `${callbackMatch[1]}${callbackMatch[2]}`,
@@ -186,7 +204,7 @@ export class RubyParser {
       }
 
       // Scope definitions
-      const scopeMatch = line.match(/^\s*scope\s+:(\w+)/);
+      const scopeMatch = SCOPE_RE.exec(line);
       if (scopeMatch) {
         result.symbols.push({
           name: scopeMatch[1],
@@ -202,7 +220,7 @@ export class RubyParser {
       }
 
       // Attr accessors
-      const attrMatch = line.match(/^\s*(attr_reader|attr_writer|attr_accessor)\s+:(\w+)/);
+      const attrMatch = ATTR_RE.exec(line);
       if (attrMatch) {
         result.symbols.push({
           name: attrMatch[2],
@@ -218,49 +236,49 @@ export class RubyParser {
       }
 
       // Include statements
-      const includeMatch = line.match(/^\s*include\s+(\w+)/);
+      const includeMatch = INCLUDE_RE.exec(line);
       if (includeMatch) {
         result.includes.push(includeMatch[1]);
         continue;
       }
 
       // Extend statements
-      const extendMatch = line.match(/^\s*extend\s+(\w+)/);
+      const extendMatch = EXTEND_RE.exec(line);
       if (extendMatch) {
         result.extends.push(extendMatch[1]);
         continue;
       }
 
       // Require statements
-      const requireMatch = line.match(/^\s*require\s+['"]([^'"]+)['"]/);
+      const requireMatch = REQUIRE_RE.exec(line);
       if (requireMatch) {
         result.requires.push(requireMatch[1]);
         continue;
       }
 
       // Require_relative statements
-      const requireRelativeMatch = line.match(/^\s*require_relative\s+['"]([^'"]+)['"]/);
+      const requireRelativeMatch = REQUIRE_RELATIVE_RE.exec(line);
       if (requireRelativeMatch) {
         result.require_relatives.push(requireRelativeMatch[1]);
         continue;
       }
 
       // Visibility modifiers
-      if (line.match(/^\s*private\s*$/)) {
+      if (PRIVATE_RE.test(line)) {
         currentVisibility = 'private';
         continue;
       }
-      if (line.match(/^\s*protected\s*$/)) {
+      if (PROTECTED_RE.test(line)) {
         currentVisibility = 'protected';
         continue;
       }
-      if (line.match(/^\s*public\s*$/)) {
+      if (PUBLIC_RE.test(line)) {
         currentVisibility = 'public';
         continue;
       }
 
       // End statements
-      if (line.match(/^\s*end\s*$/)) {
+      if (END_RE.test(line)) {
         if (classStack.length > 0) {
           classStack.pop();
           currentVisibility = 'public'; // Reset visibility when leaving class/module
@@ -273,10 +291,10 @@ export class RubyParser {
     let depth = 1;
     for (let i = startIndex + 1; i < lines.length; i++) {
       const line = lines[i].trim();
-      if (line.match(/^\s*(class|module|def|if|unless|while|until|for|begin|case)\b/)) {
+      if (BLOCK_OPEN_RE.test(line)) {
         depth++;
       }
-      if (line === 'end' || line.match(/^\s*end\s*$/)) {
+      if (line === 'end' || END_RE.test(line)) {
         depth--;
         if (depth === 0) {
           return i + 1;
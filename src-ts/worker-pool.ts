@@ -0,0 +1,58 @@
+/**
+ * Least-loaded worker pool shared by the native and regex parser pools
+ */
+
+import { cpus } from 'node:os';
+
+/**
+ * Workers to run: PARSER_WORKERS when set, else one per core up to max
+ */
+export function poolSize(max: number = Infinity): number {
+  const configured = Math.floor(Number(process.env.PARSER_WORKERS));
+  return configured > 0 ? configured : Math.max(1, Math.min(max, cpus().length));
+}
+
+export interface PoolWorker {
+  // False once the worker has exited or failed
+  readonly alive: boolean;
+  // Requests in flight
+  readonly load: number;
+  close(): void;
+}
+
+export class WorkerPool<W extends PoolWorker> {
+  private workers: W[] = [];
+  private size: number;
+  private spawn: () => W;
+
+  constructor(size: number, spawn: () => W) {
+    this.size = size;
+    this.spawn = spawn;
+  }
+
+  close(): void {
+    for (const worker of this.workers) {
+      worker.close();
+    }
+    this.workers = [];
+  }
+
+  // Least-loaded live worker, spawning (or replacing a dead one) until
+  // the pool is full
+  protected acquire(): W {
+    this.workers = this.workers.filter(worker => worker.alive);
+
+    let best: W | undefined;
+    for (const worker of this.workers) {
+      if (!best || worker.load < best.load) {
+        best = worker;
+      }
+    }
+
+    if ((!best || best.load > 0) && this.workers.length < this.size) {
+      best = this.spawn();
+      this.workers.push(best);
+    }
+    return best!;
+  }
+}
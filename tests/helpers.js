@@ -0,0 +1,36 @@
+/**
+ * Shared setup for the tests, which run against the compiled dist/ build
+ */
+
+import * as fs from 'node:fs';
+import * as os from 'node:os';
+import * as path from 'node:path';
+import { fileURLToPath } from 'node:url';
+import { IndexDatabase } from '../dist/database.js';
+import { CodeIndexer } from '../dist/indexer.js';
+
+const RUBY_PARSER = fileURLToPath(new URL('../src/ruby_ast_parser.rb', import.meta.url));
+
+/**
+ * A throwaway Rails tree holding the given files, with its own index.
+ * Everything is closed and removed when the test ends.
+ */
+export function railsFixture(t, files) {
+  const repo = fs.mkdtempSync(path.join(os.tmpdir(), 'rails-ast-test-'));
+  for (const [relativePath, content] of Object.entries(files)) {
+    const filePath = path.join(repo, relativePath);
+    fs.mkdirSync(path.dirname(filePath), { recursive: true });
+    fs.writeFileSync(filePath, content);
+  }
+
+  fs.mkdirSync(path.join(repo, '.rails-index'));
+  const db = new IndexDatabase(path.join(repo, '.rails-index', 'index.db'));
+  const indexer = new CodeIndexer(repo, db, RUBY_PARSER);
+
+  t.after(() => {
+    indexer.close();
+    db.close();
+    fs.rmSync(repo, { recursive: true, force: true });
+  });
+  return { repo, db, indexer };
+}
@@ -0,0 +1,27 @@
+import { test } from 'node:test';
+import assert from 'node:assert/strict';
+import { railsFixture } from './helpers.js';
+
+const POST_MODEL = `class Post < ApplicationRecord
+  belongs_to :user
+  validates :title, presence: true
+end
+`;
+
+test('out-of-range and fractional lines are clamped to the file', async (t) => {
+  const { indexer } = railsFixture(t, { 'app/models/post.rb': POST_MODEL });
+
+  // The first request leaves the file's line offsets cached
+  const whole = await indexer.getSnippet('app/models/post.rb', 1, 4);
+  assert.equal(whole.snippet, POST_MODEL.trimEnd());
+
+  const negative = await indexer.getSnippet('app/models/post.rb', -5, 2);
+  assert.equal(negative.start_line, 1);
+  assert.equal(negative.end_line, 2);
+  assert.equal(negative.snippet, 'class Post < ApplicationRecord\n  belongs_to :user');
+
+  const fractional = await indexer.getSnippet('app/models/post.rb', 2.5, 3.7);
+  assert.equal(fractional.start_line, 2);
+  assert.equal(fractional.end_line, 3);
+  assert.equal(fractional.snippet, '  belongs_to :user\n  validates :title, presence: true');
+});
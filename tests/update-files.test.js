@@ -0,0 +1,27 @@
+import { test } from 'node:test';
+import assert from 'node:assert/strict';
+import * as fs from 'node:fs';
+import * as path from 'node:path';
+import { railsFixture } from './helpers.js';
+
+const USER_MODEL = `class User < ApplicationRecord
+  def full_name
+    "#{first_name} #{last_name}"
+  end
+end
+`;
+
+test('a deleted file leaves no symbols or graph nodes behind', async (t) => {
+  const { repo, db, indexer } = railsFixture(t, { 'app/models/user.rb': USER_MODEL });
+  await indexer.reindex();
+  assert.ok(db.graph.getNodeByKey('class', 'User'));
+  assert.ok(db.graph.findNodes({ q: 'full_name' }).length > 0);
+
+  fs.rmSync(path.join(repo, 'app/models/user.rb'));
+  const { removed } = await indexer.updateFiles(['app/models/user.rb']);
+
+  assert.equal(removed, 1);
+  assert.ok(!db.getFileByPath('app/models/user.rb'));
+  assert.equal(db.graph.getNodeByKey('class', 'User'), null);
+  assert.deepEqual(db.graph.findNodes({ q: 'full_name' }), []);
+});